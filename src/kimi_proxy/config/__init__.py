@@ -5,6 +5,7 @@ Configuration du Kimi Proxy Dashboard.
 from .loader import load_config, reload_config
 from .settings import Settings, SanitizerConfig, CompressionConfig
 from .display import (
+    get_provider_meta,
     get_provider_display_name,
     get_provider_icon,
     get_provider_color,
@@ -17,6 +18,7 @@ __all__ = [
     "Settings",
     "SanitizerConfig",
     "CompressionConfig",
+    "get_provider_meta",
     "get_provider_display_name",
     "get_provider_icon",
     "get_provider_color",
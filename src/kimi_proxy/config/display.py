@@ -1,42 +1,32 @@
 """
 Fonctions d'affichage pour providers et modèles.
 """
-
-# Mapping des noms d'affichage des providers
-PROVIDER_DISPLAY_NAMES = {
-    "managed:kimi-code": "🌙 Kimi Code",
-    "nvidia": "🟢 NVIDIA",
-    "mistral": "🔷 Mistral",
-    "openrouter": "🔀 OpenRouter",
-    "siliconflow": "💧 SiliconFlow",
-    "groq": "⚡ Groq",
-    "cerebras": "🧠 Cerebras",
-    "gemini": "💎 Gemini"
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+# Table de traduction des fallbacks d'affichage ("-" -> " ", en une passe)
+_DASH_TO_SPACE = str.maketrans("-", " ")
+_MANAGED_PREFIX = "managed:"
+
+# Métadonnées d'affichage des providers: (nom d'affichage, icône Lucide, couleur Tailwind)
+PROVIDER_META = {
+    "managed:kimi-code": ("🌙 Kimi Code", "bot", "purple"),
+    "nvidia": ("🟢 NVIDIA", "gpu", "green"),
+    "mistral": ("🔷 Mistral", "wind", "blue"),
+    "openrouter": ("🔀 OpenRouter", "git-branch", "orange"),
+    "siliconflow": ("💧 SiliconFlow", "droplets", "cyan"),
+    "groq": ("⚡ Groq", "zap", "yellow"),
+    "cerebras": ("🧠 Cerebras", "brain", "red"),
+    "gemini": ("💎 Gemini", "sparkles", "indigo")
 }
 
-# Mapping des icônes Lucide
-PROVIDER_ICONS = {
-    "managed:kimi-code": "bot",
-    "nvidia": "gpu",
-    "mistral": "wind",
-    "openrouter": "git-branch",
-    "siliconflow": "droplets",
-    "groq": "zap",
-    "cerebras": "brain",
-    "gemini": "sparkles"
-}
+_DEFAULT_PROVIDER_ICON = "cpu"
+_DEFAULT_PROVIDER_COLOR = "slate"
 
-# Mapping des couleurs Tailwind
-PROVIDER_COLORS = {
-    "managed:kimi-code": "purple",
-    "nvidia": "green",
-    "mistral": "blue",
-    "openrouter": "orange",
-    "siliconflow": "cyan",
-    "groq": "yellow",
-    "cerebras": "red",
-    "gemini": "indigo"
-}
+# Vues par attribut, conservées pour compatibilité (dérivées de PROVIDER_META)
+PROVIDER_DISPLAY_NAMES = {key: meta[0] for key, meta in PROVIDER_META.items()}
+PROVIDER_ICONS = {key: meta[1] for key, meta in PROVIDER_META.items()}
+PROVIDER_COLORS = {key: meta[2] for key, meta in PROVIDER_META.items()}
 
 # Mapping des noms d'affichage des modèles
 MODEL_DISPLAY_NAMES = {
@@ -63,34 +53,53 @@ MODEL_DISPLAY_NAMES = {
 }
 
 
+def _fallback_provider_display_name(provider_key: str) -> str:
+    """Nom d'affichage dérivé de la clé pour un provider inconnu."""
+    if provider_key.startswith(_MANAGED_PREFIX):
+        provider_key = provider_key[len(_MANAGED_PREFIX):]
+    return provider_key.translate(_DASH_TO_SPACE).title()
+
+
+@lru_cache(maxsize=64)
+def get_provider_meta(provider_key: str) -> Tuple[str, str, str]:
+    """Retourne (nom d'affichage, icône, couleur) d'un provider en une seule recherche."""
+    meta = PROVIDER_META.get(provider_key)
+    if meta is not None:
+        return meta
+    return (
+        _fallback_provider_display_name(provider_key),
+        _DEFAULT_PROVIDER_ICON,
+        _DEFAULT_PROVIDER_COLOR,
+    )
+
+
 def get_provider_display_name(provider_key: str) -> str:
     """Retourne le nom d'affichage d'un provider."""
-    return PROVIDER_DISPLAY_NAMES.get(
-        provider_key,
-        provider_key.replace("managed:", "").replace("-", " ").title()
-    )
+    return get_provider_meta(provider_key)[0]
 
 
 def get_provider_icon(provider_key: str) -> str:
     """Retourne l'icône Lucide pour un provider."""
-    return PROVIDER_ICONS.get(provider_key, "cpu")
+    meta = PROVIDER_META.get(provider_key)
+    return meta[1] if meta is not None else _DEFAULT_PROVIDER_ICON
 
 
 def get_provider_color(provider_key: str) -> str:
     """Retourne la couleur Tailwind pour un provider."""
-    return PROVIDER_COLORS.get(provider_key, "slate")
+    meta = PROVIDER_META.get(provider_key)
+    return meta[2] if meta is not None else _DEFAULT_PROVIDER_COLOR
 
 
+@lru_cache(maxsize=256)
 def get_model_display_name(model_key: str) -> str:
-    """Retourne le nom d'affichage d'un modèle."""
-    if model_key in MODEL_DISPLAY_NAMES:
+    """Retourne le nom d'affichage d'un modèle (mémoïsé, taille bornée)."""
+    try:
         return MODEL_DISPLAY_NAMES[model_key]
+    except KeyError:
+        pass
     
     # Fallback: nettoie le nom
-    parts = model_key.split("/")
-    if len(parts) > 1:
-        return parts[-1].replace("-", " ").title()
-    return model_key.replace("-", " ").title()
+    return model_key.rpartition("/")[2].translate(_DASH_TO_SPACE).title()
 
 
 def get_max_context_for_model(model_key: str, models: dict, default: int = 262144) -> int:
@@ -99,12 +108,55 @@ def get_max_context_for_model(model_key: str, models: dict, default: int = 26214
     return model.get("max_context_size", default)
 
 
+class _ContextIndex:
+    """Index des contextes max d'un dict `models`, construit en une seule passe.
+
+    - `by_internal_model`: nom de modèle interne -> contexte (premier trouvé)
+    - `provider_min`: provider -> (plus petit contexte explicite ou None,
+      présence d'un modèle sans `max_context_size`)
+    Un contexte absent vaut `None` et est résolu avec le `default` de l'appel.
+    """
+
+    __slots__ = ("models", "by_internal_model", "provider_min")
+
+    def __init__(self, models: dict):
+        self.models = models
+        self.by_internal_model: Dict[Any, Optional[int]] = {}
+        self.provider_min: Dict[Any, Tuple[Optional[int], bool]] = {}
+        for model in models.values():
+            ctx = model.get("max_context_size")
+            self.by_internal_model.setdefault(model.get("model"), ctx)
+            provider = model.get("provider")
+            prev_min, has_missing = self.provider_min.get(provider, (None, False))
+            if ctx is None:
+                has_missing = True
+            elif prev_min is None or ctx < prev_min:
+                prev_min = ctx
+            self.provider_min[provider] = (prev_min, has_missing)
+
+
+# Index par identité du dict `models` (une config rechargée produit un nouveau dict)
+_context_indexes: Dict[int, _ContextIndex] = {}
+
+
+def _get_context_index(models: dict) -> _ContextIndex:
+    index = _context_indexes.get(id(models))
+    if index is None or index.models is not models:
+        if len(_context_indexes) >= 8:
+            _context_indexes.clear()
+        index = _context_indexes[id(models)] = _ContextIndex(models)
+    return index
+
+
 def get_max_context_for_session(session: dict, models: dict, default: int = 262144) -> int:
     """
     Récupère le contexte max pour une session basé sur son provider.
     
     Si un modèle spécifique est stocké dans la session, utilise son contexte.
     Sinon, utilise le contexte le plus petit parmi les modèles du provider (conservateur).
+
+    Les recherches par modèle interne et par provider s'appuient sur un index
+    précalculé une fois par dict `models` (au lieu d'un parcours par requête).
     """
     if not session:
         return default
@@ -118,18 +170,16 @@ def get_max_context_for_session(session: dict, models: dict, default: int = 2621
     if model_key and model_key in models:
         return models[model_key].get("max_context_size", default)
     
+    index = _get_context_index(models)
+
     # Recherche par correspondance de modèle interne (ex: moonshotai/kimi-k2-thinking)
-    if model_key:
-        for mk, model in models.items():
-            if model.get("model") == model_key:
-                return model.get("max_context_size", default)
+    if model_key and model_key in index.by_internal_model:
+        ctx = index.by_internal_model[model_key]
+        return default if ctx is None else ctx
     
-    # Sinon, trouve le contexte le plus petit parmi les modèles du provider
-    min_context = None
-    for mk, model in models.items():
-        if model.get("provider") == provider_key:
-            ctx = model.get("max_context_size", default)
-            if min_context is None or ctx < min_context:
-                min_context = ctx
+    # Sinon, le contexte le plus petit parmi les modèles du provider
+    min_context, has_missing = index.provider_min.get(provider_key, (None, False))
+    if has_missing and (min_context is None or default < min_context):
+        min_context = default
     
     return min_context if min_context else default
@@ -1,4 +1,4 @@
-"""src.kimi_proxy.config.loader
+"""kimi_proxy.config.loader
 
 Chargement de la configuration TOML.
 
@@ -7,20 +7,69 @@ Note d'architecture:
 - Il ne doit donc pas dépendre de `features/*` afin d'éviter les imports circulaires
   et de préserver l'isolation des couches.
 """
+import functools
 import os
+import re
+import sys
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Callable, Dict, Any, List, Mapping, Optional, Tuple, TypeVar
 
 from ..core.exceptions import ConfigurationError
 
-# Cache global de configuration
-_config_cache: Optional[Dict[str, Any]] = None
+# Parser TOML résolu une seule fois (tomllib en 3.11+, sinon tomli)
+try:
+    import tomllib as _toml  # type: ignore[import-not-found]
+except ImportError:
+    try:
+        import tomli as _toml  # type: ignore[no-redef]
+    except ImportError:
+        _toml = None  # type: ignore[assignment]
+_toml_loads = _toml.loads if _toml is not None else None
+
+# Cache de configuration indexé par (chemin absolu, st_mtime_ns, st_size)
+_config_cache: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+# Dernière clé chargée pour chaque chemin (invalidation rapide)
+_config_keys: Dict[str, Tuple[str, int, int]] = {}
+# Configuration courante, retournée par get_config()
+_current_config: Optional[Dict[str, Any]] = None
+# Version de configuration, incrémentée à chaque (re)chargement ou vidage du cache.
+# Invalide les dérivés mémoïsés par `_memoize_on_config`.
+_config_version: int = 0
+
+_T = TypeVar("_T")
+
+# Callbacks notifiés à chaque nouvelle version de configuration (caches dérivés
+# des couches supérieures, qui ne peuvent pas être importés depuis `config/`).
+_reload_callbacks: List[Callable[[], None]] = []
+
+# Mapping vide partagé (évite d'allouer `{}` pour chaque section absente)
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+# Répertoire projet (parent de src/), résolu une seule fois.
+# Structure: project/src/kimi_proxy/config/loader.py
+# Remonte de 4 niveaux: loader.py -> config -> kimi_proxy -> src -> project
+_PROJECT_ROOT = Path(__file__).resolve().parents[3]
+_DEFAULT_CONFIG_PATH = _PROJECT_ROOT / "config.toml"
+
+# Motif ${VAR} compilé une seule fois
+_ENV_VAR_PATTERN = re.compile(r'\$\{([^}]+)\}')
+
+
+def _replace_env_var(match: "re.Match[str]") -> str:
+    """Remplace une occurrence ${VAR} par sa valeur d'environnement (ou la laisse intacte)."""
+    var_name = match.group(1)
+    return os.environ.get(var_name, match.group(0))
 
 
 def _expand_env_vars(obj: Any) -> Any:
     """
     Récursivement étend les variables d'environnement ${VAR} dans la config.
+
+    Les dict/list sont modifiés en place (le TOML brut n'est pas conservé) et
+    seuls les noeuds effectivement substitués sont réaffectés: une config sans
+    variable d'environnement ne provoque aucune allocation.
     
     Args:
         obj: Valeur à traiter (str, dict, list)
@@ -28,29 +77,84 @@ def _expand_env_vars(obj: Any) -> Any:
     Returns:
         Valeur avec variables d'environnement expansiées
     """
-    if isinstance(obj, str):
-        # Remplace ${VAR} par la valeur de l'environnement
-        import re
-        def replace_env_var(match):
-            var_name = match.group(1)
-            return os.environ.get(var_name, match.group(0))
-        return re.sub(r'\$\{([^}]+)\}', replace_env_var, obj)
-    elif isinstance(obj, dict):
-        return {k: _expand_env_vars(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [_expand_env_vars(item) for item in obj]
+    # Dispatch par identité de type: tomllib ne produit que des str/dict/list
+    # exacts, et les scalaires (int, float, bool, datetime) sortent au plus vite.
+    t = type(obj)
+    if t is str:
+        if "${" not in obj:
+            return obj
+        return _ENV_VAR_PATTERN.sub(_replace_env_var, obj)
+    if t is dict:
+        for k, v in obj.items():
+            nv = _expand_env_vars(v)
+            if nv is not v:
+                obj[k] = nv
+        return obj
+    if t is list:
+        for i, item in enumerate(obj):
+            nv = _expand_env_vars(item)
+            if nv is not item:
+                obj[i] = nv
+        return obj
     return obj
 
 
+def _memoize_on_config(func: Callable[[Dict[str, Any]], _T]) -> Callable[[Dict[str, Any]], _T]:
+    """Mémoïse un dérivé pur de la configuration.
+
+    Les dicts n'étant pas hashables, le cache est indexé par `id(config)` et
+    conserve une référence forte vers `config` (pas de collision d'id après GC).
+    Une entrée n'est valide que pour la `_config_version` courante.
+    """
+    cache: Dict[int, Tuple[int, Dict[str, Any], _T]] = {}
+
+    @functools.wraps(func)
+    def wrapper(config: Dict[str, Any]) -> _T:
+        entry = cache.get(id(config))
+        if entry is not None and entry[0] == _config_version and entry[1] is config:
+            return entry[2]
+        result = func(config)
+        if len(cache) >= 8:
+            cache.clear()
+        cache[id(config)] = (_config_version, config, result)
+        return result
+
+    wrapper.cache_clear = cache.clear  # type: ignore[attr-defined]
+    return wrapper
+
+
+def on_config_reload(callback: Callable[[], None]) -> Callable[[], None]:
+    """Enregistre un callback appelé à chaque nouvelle version de configuration.
+
+    Utilisable comme décorateur. Le callback ne reçoit aucun argument.
+    """
+    _reload_callbacks.append(callback)
+    return callback
+
+
+def _bump_config_version() -> None:
+    """Incrémente la version de configuration et notifie les callbacks."""
+    global _config_version
+    _config_version += 1
+    for callback in _reload_callbacks:
+        callback()
+
+
 def _clear_config_cache():
     """Vide le cache de configuration."""
-    global _config_cache
-    _config_cache = None
+    global _current_config
+    _config_cache.clear()
+    _config_keys.clear()
+    _current_config = None
+    _bump_config_version()
 
 
 def load_config(config_path: str | None = None) -> Dict[str, Any]:
     """
     Charge la configuration depuis config.toml.
+
+    Le résultat est mis en cache par (chemin absolu, mtime, taille): un fichier
+    inchangé n'est ni relu ni reparsé, un fichier modifié l'est automatiquement.
     
     Args:
         config_path: Chemin vers le fichier config (optionnel)
@@ -61,55 +165,63 @@ def load_config(config_path: str | None = None) -> Dict[str, Any]:
     Raises:
         ConfigurationError: Si le fichier n'existe pas ou est invalide
     """
-    global _config_cache
-    
-    if _config_cache is not None:
-        return _config_cache
+    global _current_config
     
-    if config_path is None:
-        # Cherche config.toml dans le répertoire projet (parent de src/)
-        # Structure: project/src/kimi_proxy/config/loader.py
-        current_file = os.path.abspath(__file__)
-        # Remonte de 4 niveaux: loader.py -> config -> kimi_proxy -> src -> project
-        project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(current_file))))
-        config_path = os.path.join(project_dir, "config.toml")
-    
-    path = Path(config_path)
-    if not path.exists():
+    path = Path(config_path).resolve() if config_path else _DEFAULT_CONFIG_PATH
+    try:
+        st = path.stat()
+    except OSError:
         raise ConfigurationError(
-            message=f"Fichier de configuration non trouvé: {config_path}",
+            message=f"Fichier de configuration non trouvé: {path}",
             config_key="config_path"
         )
+
+    abspath = str(path)
+    key = (abspath, st.st_mtime_ns, st.st_size)
+    cached = _config_cache.get(key)
+    if cached is not None:
+        # Retour à une configuration déjà chargée (autre fichier): nouvelle
+        # version courante, les caches dérivés doivent être invalidés
+        if cached is not _current_config:
+            _current_config = cached
+            _bump_config_version()
+        return cached
     
-    try:
-        import tomllib  # type: ignore[import-not-found]
-        with open(path, "rb") as f:
-            raw_config = tomllib.load(f)
-            _config_cache = _expand_env_vars(raw_config)
-    except ImportError:
-        try:
-            import tomli
-            with open(path, "rb") as f:
-                raw_config = tomli.load(f)
-                _config_cache = _expand_env_vars(raw_config)
-        except ImportError:
-            raise ConfigurationError(
-                message="tomllib ou tomli requis pour charger la configuration",
-                config_key="dependencies"
-            )
+    if _toml_loads is None:
+        raise ConfigurationError(
+            message="tomllib ou tomli requis pour charger la configuration",
+            config_key="dependencies"
+        )
+
+    with open(path, "rb") as f:
+        data = f.read()
+    config = _toml_loads(data.decode())
+    # Sans `${` dans le texte brut, aucune substitution possible: pas de parcours
+    if b"${" in data:
+        config = _expand_env_vars(config)
+
+    # Invalide l'ancienne version de ce fichier avant d'enregistrer la nouvelle
+    previous_key = _config_keys.get(abspath)
+    if previous_key is not None:
+        _config_cache.pop(previous_key, None)
+    _config_cache[key] = config
+    _config_keys[abspath] = key
+    _current_config = config
+    _bump_config_version()
     
-    return _config_cache
+    return config
 
 
 def reload_config(config_path: str | None = None) -> Dict[str, Any]:
     """
     Recharge la configuration depuis le fichier.
+
+    Si le fichier n'a pas changé depuis le dernier chargement (mtime et taille
+    identiques), la configuration en cache est retournée sans relecture.
     
     Returns:
         Nouvelle configuration chargée
     """
-    global _config_cache
-    _config_cache = None
     return load_config(config_path)
 
 
@@ -120,65 +232,150 @@ def get_config() -> Dict[str, Any]:
     Returns:
         Configuration actuelle
     """
-    global _config_cache
-    if _config_cache is None:
+    if _current_config is None:
         return load_config()
-    return _config_cache
+    return _current_config
 
 
-def init_providers(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+@_memoize_on_config
+def init_providers(config: Dict[str, Any]) -> Mapping[str, Mapping[str, Any]]:
     """
     Initialise les providers depuis la configuration.
+
+    Le résultat est construit une fois par version de configuration puis
+    partagé: vues en lecture seule (`MappingProxyType`) pour éviter toute
+    mutation accidentelle d'une instance commune.
     
     Args:
         config: Configuration chargée
         
     Returns:
-        Dictionnaire des providers
+        Dictionnaire (lecture seule) des providers
     """
     providers = {}
     providers_config = config.get("providers", {})
     
     for provider_key, provider_data in providers_config.items():
-        providers[provider_key] = {
+        # Clés internées: comparaisons/lookups en aval par identité de pointeur
+        provider_key = sys.intern(provider_key)
+        providers[provider_key] = MappingProxyType({
             "key": provider_key,
             "type": provider_data.get("type", "openai"),
             "base_url": provider_data.get("base_url", ""),
             "api_key": provider_data.get("api_key", "")
-        }
+        })
     
-    return providers
+    return MappingProxyType(providers)
 
 
-def init_models(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+@_memoize_on_config
+def init_models(config: Dict[str, Any]) -> Mapping[str, Mapping[str, Any]]:
     """
     Initialise les modèles depuis la configuration.
+
+    Même politique que `init_providers`: instance partagée, en lecture seule.
     
     Args:
         config: Configuration chargée
         
     Returns:
-        Dictionnaire des modèles
+        Dictionnaire (lecture seule) des modèles
     """
     models = {}
     models_config = config.get("models", {})
     
     for model_key, model_data in models_config.items():
+        model_key = sys.intern(model_key)
         provider = model_data.get("provider", "nvidia")
-        models[model_key] = {
+        if isinstance(provider, str):
+            provider = sys.intern(provider)
+        models[model_key] = MappingProxyType({
             "key": model_key,
             "model": model_data.get("model", model_key),
             "provider": provider,
             "max_context_size": model_data.get("max_context_size", 262144),
-            "capabilities": model_data.get("capabilities", [])
-        }
+            "capabilities": tuple(model_data.get("capabilities", ()))
+        })
     
-    return models
+    return MappingProxyType(models)
+
+
+def _iter_slash_suffixes(name: str):
+    """Génère chaque suffixe situé après un `/` (ex: "a/b/c" -> "b/c", "c")."""
+    pos = name.find("/")
+    while pos != -1:
+        yield name[pos + 1:]
+        pos = name.find("/", pos + 1)
+
+
+@dataclass(frozen=True, slots=True)
+class ProviderIndex:
+    """Index inversés modèle -> provider, construits une fois par config.
+
+    Reproduit l'ordre de résolution historique de la détection provider:
+    1. clé exacte de `[models]`
+    2. suffixe de clé (`model_key.endswith("/" + model)`), première clé gagnante
+    3. nom de modèle interne, exact ou suffixe, première entrée gagnante
+    """
 
+    by_key: Mapping[str, Optional[str]]
+    by_key_suffix: Mapping[str, Optional[str]]
+    by_internal_model: Mapping[str, Optional[str]]
 
+    def lookup(self, model: str) -> Optional[str]:
+        """Retourne le provider du modèle, ou None si inconnu."""
+        for index in (self.by_key, self.by_key_suffix, self.by_internal_model):
+            if model in index:
+                return index[model]
+        return None
+
+
+def build_provider_indexes(models_config: Mapping[str, Any]) -> ProviderIndex:
+    """
+    Construit les index de détection provider en une passe sur `[models]`.
+
+    Args:
+        models_config: Section `[models]` de la configuration
+
+    Returns:
+        Index inversés (clé, suffixe de clé, modèle interne)
+    """
+    by_key: Dict[str, Optional[str]] = {}
+    by_key_suffix: Dict[str, Optional[str]] = {}
+    by_internal_model: Dict[str, Optional[str]] = {}
+
+    for model_key, model_data in models_config.items():
+        provider = model_data.get("provider")
+        if isinstance(provider, str):
+            provider = sys.intern(provider)
+        by_key[model_key] = provider
+        for suffix in _iter_slash_suffixes(model_key):
+            by_key_suffix.setdefault(suffix, provider)
+
+        internal_model = model_data.get("model", "")
+        if isinstance(internal_model, str):
+            by_internal_model.setdefault(internal_model, provider)
+            for suffix in _iter_slash_suffixes(internal_model):
+                by_internal_model.setdefault(suffix, provider)
+
+    return ProviderIndex(
+        by_key=by_key,
+        by_key_suffix=by_key_suffix,
+        by_internal_model=by_internal_model,
+    )
+
+
+# Clés du sanitizer reprises telles quelles depuis la section TOML
+_SANITIZER_KEYS = ("enabled", "threshold_tokens", "preview_length", "tmp_dir")
+
+
+@_memoize_on_config
 def get_sanitizer_config(config: Dict[str, Any]) -> Dict[str, Any]:
     """
     Extrait la configuration du sanitizer.
+
+    Mémoïsé par version de configuration: le dict retourné est partagé et ne
+    doit pas être modifié par l'appelant.
     
     Args:
         config: Configuration chargée
@@ -188,21 +385,23 @@ def get_sanitizer_config(config: Dict[str, Any]) -> Dict[str, Any]:
     """
     from ..core.constants import DEFAULT_SANITIZER_CONFIG
     
-    sanitizer_config = config.get("sanitizer", {})
+    sanitizer_config = config.get("sanitizer") or _EMPTY
+    routing = sanitizer_config.get("routing") or _EMPTY
     return {
-        "enabled": sanitizer_config.get("enabled", DEFAULT_SANITIZER_CONFIG["enabled"]),
-        "threshold_tokens": sanitizer_config.get("threshold_tokens", DEFAULT_SANITIZER_CONFIG["threshold_tokens"]),
-        "preview_length": sanitizer_config.get("preview_length", DEFAULT_SANITIZER_CONFIG["preview_length"]),
-        "tmp_dir": sanitizer_config.get("tmp_dir", DEFAULT_SANITIZER_CONFIG["tmp_dir"]),
+        **DEFAULT_SANITIZER_CONFIG,
+        **{key: sanitizer_config[key] for key in _SANITIZER_KEYS if key in sanitizer_config},
         "tags": sanitizer_config.get("trigger_tags", DEFAULT_SANITIZER_CONFIG["tags"]),
-        "fallback_threshold": sanitizer_config.get("routing", {}).get("fallback_threshold", 0.90),
-        "heavy_duty_fallback": sanitizer_config.get("routing", {}).get("heavy_duty_fallback", True),
+        "fallback_threshold": routing.get("fallback_threshold", 0.90),
+        "heavy_duty_fallback": routing.get("heavy_duty_fallback", True),
     }
 
 
+@_memoize_on_config
 def get_compression_config(config: Dict[str, Any]) -> Dict[str, Any]:
     """
     Extrait la configuration de compression.
+
+    Mémoïsé par version de configuration (dict partagé, lecture seule).
     
     Args:
         config: Configuration chargée
@@ -220,7 +419,64 @@ def get_compression_config(config: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-@dataclass(frozen=True)
+def _clamp_int(
+    value: object,
+    default: int,
+    min_value: int,
+    max_value: int | None = None,
+    allow_float: bool = False,
+) -> int:
+    """Borne un entier TOML à [min_value, max_value]; `default` si type invalide.
+
+    Les bool sont rejetés (sous-classe de int). Les float ne sont acceptés
+    (tronqués) que si `allow_float` est vrai.
+    """
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, int):
+        v = value
+    elif allow_float and isinstance(value, float):
+        v = int(value)
+    else:
+        return default
+    if v < min_value:
+        return min_value
+    if max_value is not None and v > max_value:
+        return max_value
+    return v
+
+
+def _clamp_float(value: object, default: float, min_value: float, max_value: float) -> float:
+    """Borne un nombre TOML (int/float, hors bool) à [min_value, max_value]."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        v = float(value)
+        if v < min_value:
+            return min_value
+        if v > max_value:
+            return max_value
+        return v
+    return default
+
+
+def _clamp_ints(
+    obj: Mapping[str, Any],
+    defaults: object,
+    schema: Tuple[Tuple[str, int, int | None], ...],
+    allow_float: bool = False,
+) -> Dict[str, int]:
+    """Applique `_clamp_int` à chaque ligne `(clé, min, max)` d'un schéma.
+
+    Les valeurs par défaut sont lues sur l'instance `defaults` (dataclass),
+    afin de ne pas les dupliquer dans le schéma.
+    """
+    values = {}
+    for key, min_value, max_value in schema:
+        default = getattr(defaults, key)
+        values[key] = _clamp_int(obj.get(key, default), default, min_value, max_value, allow_float)
+    return values
+
+
+@dataclass(frozen=True, slots=True)
 class MCPPrunerBackendConfig:
     """Configuration du serveur MCP Pruner (fallback TOML).
 
@@ -236,6 +492,20 @@ class MCPPrunerBackendConfig:
     cache_max_entries: int = 256
 
 
+# Schéma (clé, min, max) des entiers de `[mcp_pruner]`
+_MCP_PRUNER_INT_SCHEMA = (
+    ("deepinfra_timeout_ms", 1, 120_000),
+    ("deepinfra_max_docs", 1, 512),
+    ("cache_ttl_s", 1, 3600),
+    ("cache_max_entries", 1, 100_000),
+)
+
+
+# Défauts partagés de `[mcp_pruner]`: une section absente ne construit aucune instance
+_DEFAULT_MCP_PRUNER = MCPPrunerBackendConfig()
+
+
+@_memoize_on_config
 def get_mcp_pruner_backend_config(config: Dict[str, Any]) -> MCPPrunerBackendConfig:
     """Charge la config `[mcp_pruner]` depuis le TOML avec fallback robuste.
 
@@ -244,7 +514,7 @@ def get_mcp_pruner_backend_config(config: Dict[str, Any]) -> MCPPrunerBackendCon
     - N'applique pas la priorité env: cette priorité est gérée au point de consommation.
     """
 
-    defaults = MCPPrunerBackendConfig()
+    defaults = _DEFAULT_MCP_PRUNER
     obj = config.get("mcp_pruner")
     if not isinstance(obj, dict):
         return defaults
@@ -265,55 +535,13 @@ def get_mcp_pruner_backend_config(config: Dict[str, Any]) -> MCPPrunerBackendCon
             if mapped:
                 backend = ",".join(mapped)
 
-    def _clamp_int(value: object, *, default: int, min_value: int, max_value: int) -> int:
-        if isinstance(value, int) and not isinstance(value, bool):
-            v = value
-        elif isinstance(value, float) and not isinstance(value, bool):
-            v = int(value)
-        else:
-            return default
-        if v < min_value:
-            return min_value
-        if v > max_value:
-            return max_value
-        return v
-
-    deepinfra_timeout_ms = _clamp_int(
-        obj.get("deepinfra_timeout_ms", defaults.deepinfra_timeout_ms),
-        default=defaults.deepinfra_timeout_ms,
-        min_value=1,
-        max_value=120_000,
-    )
-    deepinfra_max_docs = _clamp_int(
-        obj.get("deepinfra_max_docs", defaults.deepinfra_max_docs),
-        default=defaults.deepinfra_max_docs,
-        min_value=1,
-        max_value=512,
-    )
-
-    cache_ttl_s = _clamp_int(
-        obj.get("cache_ttl_s", defaults.cache_ttl_s),
-        default=defaults.cache_ttl_s,
-        min_value=1,
-        max_value=3600,
-    )
-    cache_max_entries = _clamp_int(
-        obj.get("cache_max_entries", defaults.cache_max_entries),
-        default=defaults.cache_max_entries,
-        min_value=1,
-        max_value=100_000,
-    )
-
     return MCPPrunerBackendConfig(
         backend=backend,
-        deepinfra_timeout_ms=deepinfra_timeout_ms,
-        deepinfra_max_docs=deepinfra_max_docs,
-        cache_ttl_s=cache_ttl_s,
-        cache_max_entries=cache_max_entries,
+        **_clamp_ints(obj, defaults, _MCP_PRUNER_INT_SCHEMA, allow_float=True),
     )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ObservationMaskingSchema1Config:
     """Configuration Schéma 1 (tool results conversationnels)."""
 
@@ -327,6 +555,11 @@ class ObservationMaskingSchema1Config:
     )
 
 
+# Défauts partagés de `[observation_masking.schema1]`
+_DEFAULT_OBSERVATION_MASKING_SCHEMA1 = ObservationMaskingSchema1Config()
+
+
+@_memoize_on_config
 def get_observation_masking_schema1_config(config: Dict[str, Any]) -> ObservationMaskingSchema1Config:
     """Charge la configuration Schéma 1 depuis le TOML.
 
@@ -336,7 +569,7 @@ def get_observation_masking_schema1_config(config: Dict[str, Any]) -> Observatio
     - Ne dépend pas de la couche Features
     """
 
-    defaults = ObservationMaskingSchema1Config()
+    defaults = _DEFAULT_OBSERVATION_MASKING_SCHEMA1
     observation_masking_obj = config.get("observation_masking")
     if not isinstance(observation_masking_obj, dict):
         return defaults
@@ -348,11 +581,9 @@ def get_observation_masking_schema1_config(config: Dict[str, Any]) -> Observatio
     enabled_obj = schema1_obj.get("enabled", defaults.enabled)
     enabled = bool(enabled_obj)
 
-    window_turns_obj = schema1_obj.get("window_turns", defaults.window_turns)
-    if isinstance(window_turns_obj, int) and not isinstance(window_turns_obj, bool):
-        window_turns = max(0, window_turns_obj)
-    else:
-        window_turns = defaults.window_turns
+    window_turns = _clamp_int(
+        schema1_obj.get("window_turns", defaults.window_turns), defaults.window_turns, 0
+    )
 
     keep_errors_obj = schema1_obj.get("keep_errors", defaults.keep_errors)
     keep_errors = bool(keep_errors_obj)
@@ -376,7 +607,7 @@ def get_observation_masking_schema1_config(config: Dict[str, Any]) -> Observatio
     )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ContextPruningConfig:
     """Configuration d'élagage de contexte via MCP Pruner (Lot C2).
 
@@ -404,6 +635,22 @@ class ContextPruningConfig:
     include_markers: bool = True
 
 
+# Schémas (clé, min, max) des entiers de `[context_pruning]` et de ses `options`
+_CONTEXT_PRUNING_INT_SCHEMA = (
+    ("min_chars_to_prune", 0, None),
+    ("call_timeout_ms", 1, None),
+)
+_CONTEXT_PRUNING_OPTIONS_INT_SCHEMA = (
+    ("min_keep_lines", 0, None),
+    ("timeout_ms", 1, None),
+)
+
+
+# Défauts partagés de `[context_pruning]`
+_DEFAULT_CONTEXT_PRUNING = ContextPruningConfig()
+
+
+@_memoize_on_config
 def get_context_pruning_config(config: Dict[str, Any]) -> ContextPruningConfig:
     """Charge la configuration `context_pruning` depuis le TOML.
 
@@ -412,67 +659,37 @@ def get_context_pruning_config(config: Dict[str, Any]) -> ContextPruningConfig:
     - Validation/clamp des types pour éviter crash runtime
     """
 
-    defaults = ContextPruningConfig()
+    defaults = _DEFAULT_CONTEXT_PRUNING
     obj = config.get("context_pruning")
     if not isinstance(obj, dict):
         return defaults
 
     enabled = bool(obj.get("enabled", defaults.enabled))
 
-    min_chars_obj = obj.get("min_chars_to_prune", defaults.min_chars_to_prune)
-    if isinstance(min_chars_obj, int) and not isinstance(min_chars_obj, bool):
-        min_chars_to_prune = max(0, min_chars_obj)
-    else:
-        min_chars_to_prune = defaults.min_chars_to_prune
-
-    call_timeout_obj = obj.get("call_timeout_ms", defaults.call_timeout_ms)
-    if isinstance(call_timeout_obj, int) and not isinstance(call_timeout_obj, bool):
-        call_timeout_ms = max(1, call_timeout_obj)
-    else:
-        call_timeout_ms = defaults.call_timeout_ms
+    ints = _clamp_ints(obj, defaults, _CONTEXT_PRUNING_INT_SCHEMA)
 
     # options
     options_obj = obj.get("options")
-    options = options_obj if isinstance(options_obj, dict) else {}
-
-    max_prune_ratio_obj = options.get("max_prune_ratio", defaults.max_prune_ratio)
-    if isinstance(max_prune_ratio_obj, (int, float)) and not isinstance(max_prune_ratio_obj, bool):
-        max_prune_ratio = float(max_prune_ratio_obj)
-        if max_prune_ratio < 0.0:
-            max_prune_ratio = 0.0
-        if max_prune_ratio > 1.0:
-            max_prune_ratio = 1.0
-    else:
-        max_prune_ratio = defaults.max_prune_ratio
-
-    min_keep_lines_obj = options.get("min_keep_lines", defaults.min_keep_lines)
-    if isinstance(min_keep_lines_obj, int) and not isinstance(min_keep_lines_obj, bool):
-        min_keep_lines = max(0, min_keep_lines_obj)
-    else:
-        min_keep_lines = defaults.min_keep_lines
-
-    timeout_ms_obj = options.get("timeout_ms", defaults.timeout_ms)
-    if isinstance(timeout_ms_obj, int) and not isinstance(timeout_ms_obj, bool):
-        timeout_ms = max(1, timeout_ms_obj)
-    else:
-        timeout_ms = defaults.timeout_ms
+    options = options_obj if isinstance(options_obj, dict) else _EMPTY
+    options_ints = _clamp_ints(options, defaults, _CONTEXT_PRUNING_OPTIONS_INT_SCHEMA)
 
+    max_prune_ratio = _clamp_float(
+        options.get("max_prune_ratio", defaults.max_prune_ratio), defaults.max_prune_ratio, 0.0, 1.0
+    )
     annotate_lines = bool(options.get("annotate_lines", defaults.annotate_lines))
     include_markers = bool(options.get("include_markers", defaults.include_markers))
 
     return ContextPruningConfig(
         enabled=enabled,
-        min_chars_to_prune=min_chars_to_prune,
-        call_timeout_ms=call_timeout_ms,
         max_prune_ratio=max_prune_ratio,
-        min_keep_lines=min_keep_lines,
-        timeout_ms=timeout_ms,
         annotate_lines=annotate_lines,
         include_markers=include_markers,
+        **ints,
+        **options_ints,
     )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MCPToolPruningOptionsConfig:
     """Options de pruning pour les outputs MCP tools/call (fallback TOML).
 
@@ -488,7 +705,7 @@ class MCPToolPruningOptionsConfig:
     include_markers: bool = True
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MCPToolPruningConfig:
     """Configuration de pruning des réponses MCP tools/call (fallback TOML).
 
@@ -509,6 +726,22 @@ class MCPToolPruningConfig:
     options: MCPToolPruningOptionsConfig = field(default_factory=MCPToolPruningOptionsConfig)
 
 
+# Schémas (clé, min, max) des entiers de `[mcp_tool_pruning]` et de ses `options`
+_MCP_TOOL_PRUNING_INT_SCHEMA = (
+    ("min_chars", 0, None),
+    ("timeout_ms", 1, None),
+    ("max_chars_fallback", 0, None),
+)
+_MCP_TOOL_PRUNING_OPTIONS_INT_SCHEMA = (
+    ("min_keep_lines", 0, None),
+    ("timeout_ms", 1, None),
+)
+
+# Défauts partagés de `[mcp_tool_pruning]`
+_DEFAULT_MCP_TOOL_PRUNING = MCPToolPruningConfig()
+
+
+@_memoize_on_config
 def get_mcp_tool_pruning_config(config: Dict[str, Any]) -> MCPToolPruningConfig:
     """Charge la configuration `[mcp_tool_pruning]` depuis le TOML avec fallback robuste.
 
@@ -517,30 +750,14 @@ def get_mcp_tool_pruning_config(config: Dict[str, Any]) -> MCPToolPruningConfig:
     - N'applique pas la priorité env.
     """
 
-    defaults = MCPToolPruningConfig()
+    defaults = _DEFAULT_MCP_TOOL_PRUNING
     obj = config.get("mcp_tool_pruning")
     if not isinstance(obj, dict):
         return defaults
 
     enabled = bool(obj.get("enabled", defaults.enabled))
 
-    min_chars_obj = obj.get("min_chars", defaults.min_chars)
-    if isinstance(min_chars_obj, int) and not isinstance(min_chars_obj, bool):
-        min_chars = max(0, min_chars_obj)
-    else:
-        min_chars = defaults.min_chars
-
-    timeout_ms_obj = obj.get("timeout_ms", defaults.timeout_ms)
-    if isinstance(timeout_ms_obj, int) and not isinstance(timeout_ms_obj, bool):
-        timeout_ms = max(1, timeout_ms_obj)
-    else:
-        timeout_ms = defaults.timeout_ms
-
-    max_chars_fallback_obj = obj.get("max_chars_fallback", defaults.max_chars_fallback)
-    if isinstance(max_chars_fallback_obj, int) and not isinstance(max_chars_fallback_obj, bool):
-        max_chars_fallback = max(0, max_chars_fallback_obj)
-    else:
-        max_chars_fallback = defaults.max_chars_fallback
+    ints = _clamp_ints(obj, defaults, _MCP_TOOL_PRUNING_INT_SCHEMA)
 
     excluded_dirs_obj = obj.get("excluded_dirs", defaults.excluded_dirs)
     excluded_dirs: tuple[str, ...]
@@ -560,50 +777,32 @@ def get_mcp_tool_pruning_config(config: Dict[str, Any]) -> MCPToolPruningConfig:
         excluded_dirs = defaults.excluded_dirs
 
     options_obj = obj.get("options")
-    options = options_obj if isinstance(options_obj, dict) else {}
-
-    max_prune_ratio_obj = options.get("max_prune_ratio", defaults.options.max_prune_ratio)
-    if isinstance(max_prune_ratio_obj, (int, float)) and not isinstance(max_prune_ratio_obj, bool):
-        max_prune_ratio = float(max_prune_ratio_obj)
-        if max_prune_ratio < 0.0:
-            max_prune_ratio = 0.0
-        if max_prune_ratio > 1.0:
-            max_prune_ratio = 1.0
-    else:
-        max_prune_ratio = defaults.options.max_prune_ratio
-
-    min_keep_lines_obj = options.get("min_keep_lines", defaults.options.min_keep_lines)
-    if isinstance(min_keep_lines_obj, int) and not isinstance(min_keep_lines_obj, bool):
-        min_keep_lines = max(0, min_keep_lines_obj)
-    else:
-        min_keep_lines = defaults.options.min_keep_lines
-
-    options_timeout_ms_obj = options.get("timeout_ms", defaults.options.timeout_ms)
-    if isinstance(options_timeout_ms_obj, int) and not isinstance(options_timeout_ms_obj, bool):
-        options_timeout_ms = max(1, options_timeout_ms_obj)
-    else:
-        options_timeout_ms = defaults.options.timeout_ms
+    options = options_obj if isinstance(options_obj, dict) else _EMPTY
 
+    max_prune_ratio = _clamp_float(
+        options.get("max_prune_ratio", defaults.options.max_prune_ratio),
+        defaults.options.max_prune_ratio,
+        0.0,
+        1.0,
+    )
+    options_ints = _clamp_ints(options, defaults.options, _MCP_TOOL_PRUNING_OPTIONS_INT_SCHEMA)
     annotate_lines = bool(options.get("annotate_lines", defaults.options.annotate_lines))
     include_markers = bool(options.get("include_markers", defaults.options.include_markers))
 
     return MCPToolPruningConfig(
         enabled=enabled,
-        min_chars=min_chars,
-        timeout_ms=timeout_ms,
-        max_chars_fallback=max_chars_fallback,
         excluded_dirs=excluded_dirs,
         options=MCPToolPruningOptionsConfig(
             max_prune_ratio=max_prune_ratio,
-            min_keep_lines=min_keep_lines,
-            timeout_ms=options_timeout_ms,
             annotate_lines=annotate_lines,
             include_markers=include_markers,
+            **options_ints,
         ),
+        **ints,
     )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MCPGatewayConfig:
     """Configuration de la passerelle MCP (circuit breaker)."""
     cb_enabled: bool = True
@@ -611,6 +810,7 @@ class MCPGatewayConfig:
     cb_similarity_threshold: float = 0.85
 
 
+@_memoize_on_config
 def get_mcp_gateway_config(config: Dict[str, Any]) -> MCPGatewayConfig:
     """
     Extrait la configuration de la passerelle MCP (gateway) depuis la section [mcp.gateway].
@@ -639,30 +839,18 @@ def get_mcp_gateway_config(config: Dict[str, Any]) -> MCPGatewayConfig:
         
     cb_enabled = bool(gateway_obj.get("cb_enabled", defaults.cb_enabled))
     
-    def _clamp_int(value: object, *, default: int, min_value: int) -> int:
-        if isinstance(value, int) and not isinstance(value, bool):
-            return max(min_value, value)
-        if isinstance(value, float) and not isinstance(value, bool):
-            return max(min_value, int(value))
-        return default
-        
-    def _clamp_float(value: object, *, default: float, min_value: float, max_value: float) -> float:
-        if isinstance(value, (int, float)) and not isinstance(value, bool):
-            v = float(value)
-            return max(min_value, min(max_value, v))
-        return default
-
     cb_max_failures = _clamp_int(
         gateway_obj.get("cb_max_failures", defaults.cb_max_failures),
-        default=defaults.cb_max_failures,
-        min_value=1
+        defaults.cb_max_failures,
+        1,
+        allow_float=True,
     )
     
     cb_similarity_threshold = _clamp_float(
         gateway_obj.get("cb_similarity_threshold", defaults.cb_similarity_threshold),
-        default=defaults.cb_similarity_threshold,
-        min_value=0.0,
-        max_value=1.0
+        defaults.cb_similarity_threshold,
+        0.0,
+        1.0,
     )
     
     return MCPGatewayConfig(
@@ -672,12 +860,17 @@ def get_mcp_gateway_config(config: Dict[str, Any]) -> MCPGatewayConfig:
     )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LogWatcherConfig:
     """Configuration du Log Watcher."""
     enabled: bool = False
 
 
+# Défauts partagés de `[log_watcher]`
+_DEFAULT_LOG_WATCHER = LogWatcherConfig()
+
+
+@_memoize_on_config
 def get_log_watcher_config(config: Dict[str, Any]) -> LogWatcherConfig:
     """
     Extrait la configuration du Log Watcher depuis la section [log_watcher].
@@ -688,7 +881,7 @@ def get_log_watcher_config(config: Dict[str, Any]) -> LogWatcherConfig:
     Returns:
         Configuration du Log Watcher
     """
-    defaults = LogWatcherConfig()
+    defaults = _DEFAULT_LOG_WATCHER
     obj = config.get("log_watcher")
     if not isinstance(obj, dict):
         return defaults
@@ -697,12 +890,17 @@ def get_log_watcher_config(config: Dict[str, Any]) -> LogWatcherConfig:
     return LogWatcherConfig(enabled=enabled)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DatabaseConfig:
     """Configuration de la base de données."""
     persist_sessions: bool = False
 
 
+# Défauts partagés de `[database]`
+_DEFAULT_DATABASE = DatabaseConfig()
+
+
+@_memoize_on_config
 def get_database_config(config: Dict[str, Any]) -> DatabaseConfig:
     """
     Extrait la configuration de la base de données depuis la section [database].
@@ -713,7 +911,7 @@ def get_database_config(config: Dict[str, Any]) -> DatabaseConfig:
     Returns:
         Configuration de la base de données
     """
-    defaults = DatabaseConfig()
+    defaults = _DEFAULT_DATABASE
     obj = config.get("database")
     if not isinstance(obj, dict):
         return defaults
@@ -2,11 +2,26 @@ import os
 """
 Dataclasses pour la configuration.
 """
-from dataclasses import dataclass, field  # noqa
-from typing import List, Dict, Any, Optional  # noqa
+from dataclasses import dataclass, field, fields  # noqa
+from functools import lru_cache
+from typing import List, Dict, Any, FrozenSet, Mapping, Optional, Tuple  # noqa
 
+from .loader import ProviderIndex
 
-@dataclass
+
+@lru_cache(maxsize=None)
+def _field_names(cls: type) -> FrozenSet[str]:
+    """Noms des champs d'une dataclass (calculés une fois par classe)."""
+    return frozenset(f.name for f in fields(cls))
+
+
+def _present_fields(cls: type, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Garde les seules clés de `data` qui sont des champs de `cls`; les autres prennent le défaut du champ."""
+    allowed = _field_names(cls)
+    return {key: value for key, value in data.items() if key in allowed}
+
+
+@dataclass(frozen=True, slots=True)
 class SanitizerConfig:
     """Configuration du sanitizer."""
     enabled: bool = True
@@ -20,18 +35,10 @@ class SanitizerConfig:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "SanitizerConfig":
         """Crée une instance depuis un dictionnaire."""
-        return cls(
-            enabled=data.get("enabled", True),
-            threshold_tokens=data.get("threshold_tokens", 1000),
-            preview_length=data.get("preview_length", 200),
-            tmp_dir=data.get("tmp_dir", os.path.join(os.path.expanduser("~"), ".kimi", "tmp", "kimi_proxy_masked")),
-            tags=data.get("tags", ["@file", "@codebase", "@tool", "@console", "@output"]),
-            fallback_threshold=data.get("fallback_threshold", 0.90),
-            heavy_duty_fallback=data.get("heavy_duty_fallback", True)
-        )
+        return cls(**_present_fields(cls, data))
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CompressionConfig:
     """Configuration de compression."""
     enabled: bool = True
@@ -42,15 +49,10 @@ class CompressionConfig:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "CompressionConfig":
         """Crée une instance depuis un dictionnaire."""
-        return cls(
-            enabled=data.get("enabled", True),
-            threshold_percentage=data.get("threshold_percentage", 85),
-            preserve_recent_exchanges=data.get("preserve_recent_exchanges", 5),
-            summary_max_tokens=data.get("summary_max_tokens", 500)
-        )
+        return cls(**_present_fields(cls, data))
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RateLimitConfig:
     """Configuration du rate limiting."""
     max_rpm: int = 40
@@ -60,14 +62,10 @@ class RateLimitConfig:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "RateLimitConfig":
         """Crée une instance depuis un dictionnaire."""
-        return cls(
-            max_rpm=data.get("max_rpm", 40),
-            warning_threshold=data.get("warning_threshold", 0.875),
-            critical_threshold=data.get("critical_threshold", 0.95)
-        )
+        return cls(**_present_fields(cls, data))
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Settings:
     """Configuration globale de l'application."""
     default_provider: str = "managed:kimi-code"
@@ -76,13 +74,34 @@ class Settings:
     sanitizer: SanitizerConfig = field(default_factory=SanitizerConfig)
     compression: CompressionConfig = field(default_factory=CompressionConfig)
     rate_limit: RateLimitConfig = field(default_factory=RateLimitConfig)
-    providers: Dict[str, Dict[str, Any]] = field(default_factory=dict)
-    models: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    providers: Mapping[str, Mapping[str, Any]] = field(default_factory=dict)
+    models: Mapping[str, Mapping[str, Any]] = field(default_factory=dict)
+    provider_index: Optional[ProviderIndex] = None
+    # Modèles groupés par provider, calculés une fois depuis `models`
+    models_by_provider: Mapping[str, Tuple[Mapping[str, Any], ...]] = field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        grouped: Dict[Any, List[Mapping[str, Any]]] = {}
+        for model in self.models.values():
+            grouped.setdefault(model.get("provider"), []).append(model)
+        object.__setattr__(
+            self,
+            "models_by_provider",
+            {provider: tuple(models) for provider, models in grouped.items()},
+        )
     
     @classmethod
     def from_config(cls, config: Dict[str, Any]) -> "Settings":
         """Crée une instance depuis la configuration chargée."""
-        from .loader import init_providers, init_models, get_sanitizer_config, get_compression_config
+        from .loader import (
+            init_providers,
+            init_models,
+            get_sanitizer_config,
+            get_compression_config,
+            build_provider_indexes,
+        )
         
         return cls(
             default_provider=config.get("default_model", "managed:kimi-code"),
@@ -91,20 +110,18 @@ class Settings:
             sanitizer=SanitizerConfig.from_dict(get_sanitizer_config(config)),
             compression=CompressionConfig.from_dict(get_compression_config(config)),
             providers=init_providers(config),
-            models=init_models(config)
+            models=init_models(config),
+            provider_index=build_provider_indexes(config.get("models", {})),
         )
     
-    def get_provider(self, key: str) -> Optional[Dict[str, Any]]:
+    def get_provider(self, key: str) -> Optional[Mapping[str, Any]]:
         """Récupère un provider par sa clé."""
         return self.providers.get(key)
     
-    def get_model(self, key: str) -> Optional[Dict[str, Any]]:
+    def get_model(self, key: str) -> Optional[Mapping[str, Any]]:
         """Récupère un modèle par sa clé."""
         return self.models.get(key)
     
-    def get_models_for_provider(self, provider_key: str) -> List[Dict[str, Any]]:
-        """Récupère tous les modèles d'un provider."""
-        return [
-            model for model in self.models.values()
-            if model.get("provider") == provider_key
-        ]
+    def get_models_for_provider(self, provider_key: str) -> Tuple[Mapping[str, Any], ...]:
+        """Récupère tous les modèles d'un provider (tuple partagé, ordre de la config)."""
+        return self.models_by_provider.get(provider_key, ())
@@ -4,15 +4,36 @@ Module d'auto-création de sessions.
 Pourquoi: Détecte automatiquement lorsqu'une requête provient d'un provider
 différent de la session active et crée une nouvelle session automatiquement.
 """
-from typing import Dict, Any, Optional, Tuple
-from datetime import datetime
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, Mapping, Optional, Tuple, Union
 
-from ..core.database import create_session, update_session_external_id
-from ..config.loader import get_config
+from ..core.constants import AUTO_SESSION_PROVIDER_NAMES
+from ..config.loader import ProviderIndex, build_provider_indexes, get_config, on_config_reload
 
+if TYPE_CHECKING:
+    from ..config.settings import Settings
 
-# Cache pour le statut auto-session par session
-_auto_session_cache: Dict[int, bool] = {}
+logger = logging.getLogger(__name__)
+
+
+# Sessions dont l'auto-session est désactivée (absente = activée par défaut).
+# Ensemble ordonné LRU borné (valeurs None), protégé par verrou.
+_AUTO_SESSION_CACHE_MAX_ENTRIES = 4096
+_auto_session_disabled: "OrderedDict[int, None]" = OrderedDict()
+_auto_session_lock = threading.Lock()
+
+# Index de détection provider: (models_config de référence, index inversés).
+# Le tuple est remplacé d'un bloc, la lecture est donc cohérente sans verrou.
+_detection_state: Tuple[Optional[Dict[str, Any]], Optional[ProviderIndex]] = (None, None)
+_detection_lock = threading.Lock()
+
+# Section `[models]` de la configuration courante, résolue au premier appel
+# puis réutilisée jusqu'au prochain rechargement.
+_models_config_ref: Optional[Dict[str, Any]] = None
 
 
 def get_auto_session_status(session_id: int) -> bool:
@@ -25,7 +46,11 @@ def get_auto_session_status(session_id: int) -> bool:
     Returns:
         True si l'auto-session est activée, False sinon
     """
-    return _auto_session_cache.get(session_id, True)  # Par défaut activé
+    with _auto_session_lock:
+        if session_id not in _auto_session_disabled:
+            return True  # Par défaut activé
+        _auto_session_disabled.move_to_end(session_id)
+        return False
 
 
 def set_auto_session_status(session_id: int, enabled: bool) -> None:
@@ -36,36 +61,68 @@ def set_auto_session_status(session_id: int, enabled: bool) -> None:
         session_id: ID de la session
         enabled: True pour activer, False pour désactiver
     """
-    _auto_session_cache[session_id] = enabled
+    with _auto_session_lock:
+        if enabled:
+            _auto_session_disabled.pop(session_id, None)
+            return
+        _auto_session_disabled[session_id] = None
+        _auto_session_disabled.move_to_end(session_id)
+        if len(_auto_session_disabled) > _AUTO_SESSION_CACHE_MAX_ENTRIES:
+            _auto_session_disabled.popitem(last=False)
+
+
+@on_config_reload
+def invalidate_detection_cache() -> None:
+    """Vide l'index de détection provider et la référence `[models]` (rechargement de config)."""
+    global _detection_state, _models_config_ref
+    with _detection_lock:
+        _detection_state = (None, None)
+        _models_config_ref = None
 
 
-def detect_provider_from_model(model: str, models_config: Dict[str, Any]) -> Optional[str]:
+def _get_models_config() -> Dict[str, Any]:
+    """Retourne la section `[models]` courante sans relire la config à chaque requête."""
+    global _models_config_ref
+    models_config = _models_config_ref
+    if models_config is None:
+        models_config = _models_config_ref = get_config().get("models", {})
+    return models_config
+
+
+def _get_provider_index(models_config: Dict[str, Any]) -> ProviderIndex:
+    """Retourne l'index provider de `models_config`, construit au premier appel."""
+    global _detection_state
+    models_ref, index = _detection_state
+    if models_ref is models_config and index is not None:
+        return index
+    index = build_provider_indexes(models_config)
+    with _detection_lock:
+        _detection_state = (models_config, index)
+    return index
+
+
+def detect_provider_from_model(
+    model: str,
+    models_config: Union[Dict[str, Any], ProviderIndex],
+) -> Optional[str]:
     """
     Détecte le provider à partir du nom du modèle.
+
+    Trois recherches par hash sur des index inversés (clé exacte, suffixe de
+    clé, modèle interne), construits une fois par dict `models_config` et
+    invalidés au rechargement de la configuration.
     
     Args:
         model: Nom du modèle (ex: "nvidia/kimi-k2.5" ou "kimi-for-coding")
-        models_config: Configuration des modèles depuis config.toml
+        models_config: Configuration des modèles depuis config.toml,
+            ou index déjà construit (ex: `Settings.provider_index`)
         
     Returns:
         Clé du provider ou None si non trouvé
     """
-    # 1. Vérifier si c'est une clé exacte dans models
-    if model in models_config:
-        return models_config[model].get("provider")
-    
-    # 2. Vérifier avec le préfixe (ex: "kimi-code/kimi-for-coding")
-    for model_key, model_data in models_config.items():
-        if model_key.endswith(f"/{model}") or model_key == model:
-            return model_data.get("provider")
-    
-    # 3. Recherche par nom de modèle interne
-    for model_key, model_data in models_config.items():
-        internal_model = model_data.get("model", "")
-        if internal_model == model or internal_model.endswith(f"/{model}"):
-            return model_data.get("provider")
-    
-    return None
+    if isinstance(models_config, ProviderIndex):
+        return models_config.lookup(model)
+    return _get_provider_index(models_config).lookup(model)
 
 
 def _normalize_optional_string(value: object) -> Optional[str]:
@@ -179,10 +236,19 @@ def auto_create_session(
     Returns:
         Nouvelle session créée ou None en cas d'erreur
     """
+    from ..core.database import create_session
+
     try:
+        # Interné: les providers forment un petit ensemble de chaînes, comparées
+        # ensuite à chaque requête (should_auto_create_session)
+        detected_provider = sys.intern(detected_provider)
+
         # Générer un nom de session basé sur le provider et l'heure
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        provider_name = detected_provider.replace("managed:", "").replace("-", " ").title()
+        now = time.localtime()
+        timestamp = f"{now.tm_hour:02d}:{now.tm_min:02d}:{now.tm_sec:02d}"
+        provider_name = AUTO_SESSION_PROVIDER_NAMES.get(detected_provider) or (
+            detected_provider.replace("managed:", "").replace("-", " ").title()
+        )
         session_name = f"Session {provider_name} {timestamp}"
         
         # Créer la session
@@ -193,8 +259,12 @@ def auto_create_session(
             external_session_id=detected_external_session_id,
         )
         
-        print(f"🔄 [AUTO SESSION] Nouvelle session créée: #{new_session['id']} "
-              f"({detected_provider}/{detected_model})")
+        logger.info(
+            "🔄 [AUTO SESSION] Nouvelle session créée: #%s (%s/%s)",
+            new_session["id"],
+            detected_provider,
+            detected_model,
+        )
         
         # Diffuser via WebSocket pour que l'UI recharge
         from ..services.websocket_manager import get_connection_manager
@@ -212,13 +282,15 @@ def auto_create_session(
         return new_session
         
     except Exception as e:
-        print(f"⚠️ [AUTO SESSION] Erreur création session: {e}")
+        logger.warning("⚠️ [AUTO SESSION] Erreur création session: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
         return None
 
 
 def process_auto_session(
     request_body: Dict[str, Any],
-    current_session: Optional[Dict[str, Any]]
+    current_session: Optional[Dict[str, Any]],
+    *,
+    settings: Optional["Settings"] = None,
 ) -> Tuple[Optional[Dict[str, Any]], bool]:
     """
     Traite la logique d'auto-session pour une requête entrante.
@@ -226,27 +298,45 @@ def process_auto_session(
     Args:
         request_body: Body de la requête (parsé en JSON)
         current_session: Session active actuelle
+        settings: Settings déjà construits (optionnel). À défaut, la section
+            `[models]` de la configuration courante est utilisée (mise en cache).
         
     Returns:
         Tuple (session à utiliser, booléen indiquant si une nouvelle session a été créée)
     """
-    config = get_config()
-    models_config = config.get("models", {})
+    models_config: Mapping[str, Any]
+    provider_lookup: Union[Dict[str, Any], ProviderIndex]
+    if settings is not None:
+        models_config = settings.models
+        provider_lookup = settings.provider_index or build_provider_indexes(settings.models)
+    else:
+        models_config = provider_lookup = _get_models_config()
     
     # Extraire le modèle de la requête
     model = request_body.get("model", "")
     if not model:
         return current_session, False
     
-    # Détecter le provider depuis le modèle
-    detected_provider = extract_provider_from_request(request_body) or detect_provider_from_model(model, models_config)
+    # Détecter le provider depuis le modèle (clé exacte de `[models]` en accès direct,
+    # cas le plus courant; suffixes et modèles internes via l'index)
+    detected_provider = extract_provider_from_request(request_body)
+    if not detected_provider:
+        model_entry = models_config.get(model)
+        if model_entry is not None:
+            detected_provider = model_entry.get("provider")
+        else:
+            detected_provider = detect_provider_from_model(model, provider_lookup)
     if not detected_provider:
         return current_session, False
 
     detected_external_session_id = extract_external_session_id_from_request(request_body)
     
-    # Mapper le modèle pour le provider détecté
+    # Imports différés: base SQLite et routage proxy ne sont chargés qu'au
+    # premier traitement effectif d'une requête
+    from ..core.database import update_session_external_id
     from ..proxy.router import map_model_name
+
+    # Mapper le modèle pour le provider détecté
     mapped_model = map_model_name(model, models_config)
     
     # Vérifier si on doit créer une nouvelle session
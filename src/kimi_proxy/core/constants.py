@@ -1,14 +1,20 @@
 import os
+import re
+import sys
+from types import MappingProxyType
 """
 Constantes globales pour Kimi Proxy Dashboard.
 """
 
+# Les tables ci-dessous sont exposées en lecture seule (MappingProxyType):
+# partagées telles quelles, sans copie défensive côté appelants.
+
 # ============================================================================
 # CONFIGURATION PAR DÉFAUT
 # ============================================================================
 DEFAULT_MAX_CONTEXT = 262144  # 256K tokens
 DATABASE_FILE = "sessions.db"
-DEFAULT_PROVIDER = "managed:kimi-code"
+DEFAULT_PROVIDER = sys.intern("managed:kimi-code")  # interné: comparé aux providers des sessions
 
 # ============================================================================
 # MCP TOOL RESPONSE CHUNKING
@@ -19,7 +25,7 @@ MCP_CHUNK_OVERLAP_TOKENS = 1000  # Overlap entre chunks pour continuité
 # ============================================================================
 # RATE LIMITING
 # ============================================================================
-RATE_LIMITS = {
+RATE_LIMITS = MappingProxyType({
     "nvidia": 40,
     "mistral": 60,
     "openrouter": 30,
@@ -28,7 +34,14 @@ RATE_LIMITS = {
     "cerebras": 100,
     "gemini": 60,
     "managed:kimi-code": 40
-}
+})
+
+# Libellés provider des sessions auto-créées ("managed:kimi-code" -> "Kimi Code"),
+# précalculés pour les providers connus
+AUTO_SESSION_PROVIDER_NAMES = MappingProxyType({
+    provider: provider.replace("managed:", "").replace("-", " ").title()
+    for provider in RATE_LIMITS
+})
 
 MAX_RPM = 40  # Défaut
 RATE_LIMIT_WARNING_THRESHOLD = 0.875
@@ -40,13 +53,13 @@ RATE_LIMIT_CRITICAL_THRESHOLD = 0.95
 CONTEXT_FALLBACK_THRESHOLD = 0.90  # Seuil pour fallback modèle (90%)
 
 # Configuration par défaut du sanitizer
-DEFAULT_SANITIZER_CONFIG = {
+DEFAULT_SANITIZER_CONFIG = MappingProxyType({
     "enabled": True,
     "threshold_tokens": 1000,
     "preview_length": 200,
     "tmp_dir": os.path.join(os.path.expanduser("~"), ".kimi", "tmp", "kimi_proxy_masked"),
     "tags": ["@file", "@codebase", "@tool", "@console", "@output"]
-}
+})
 
 # ============================================================================
 # MCP MEMORY
@@ -59,7 +72,7 @@ DEFAULT_MCP_CB_MAX_FAILURES = 5
 DEFAULT_MCP_CB_SIM_THRESHOLD = 0.85
 
 # Patterns de détection MCP (utilisés dans detector.py)
-MCP_PATTERNS = {
+MCP_PATTERNS = MappingProxyType({
     # Balises explicites de mémoire MCP
     "memory_tag": r"<mcp-memory>.*?</mcp-memory>",
     "memory_ref": r"@memory\[[^\]]+\]",
@@ -80,29 +93,41 @@ MCP_PATTERNS = {
     "mcp_fast_filesystem": r"(fast_list_allowed_directories|fast_read_file|fast_read_multiple_files|fast_write_file|fast_large_write_file|fast_list_directory|fast_get_file_info|fast_create_directory|fast_search_files|fast_search_code|fast_get_directory_tree|fast_get_disk_usage|fast_find_large_files|edit_file|fast_safe_edit|fast_edit_multiple_blocks|fast_edit_blocks|fast_extract_lines|fast_copy_file|fast_move_file|fast_delete_file|fast_batch_file_operations|fast_compress_files|fast_extract_archive|fast_sync_directories)",
     # 4. json-query (3 outils)
     "mcp_json_query": r"(json_query_jsonpath|json_query_search_keys|json_query_search_values)",
-}
+})
+
+# Flags par pattern: DOTALL pour les blocs pouvant couvrir plusieurs lignes
+_MCP_PATTERN_DOTALL = {"memory_tag", "memory_block", "mcp_result", "mcp_tool"}
+
+# Patterns MCP compilés une seule fois à l'import (partagés par tous les détecteurs)
+MCP_PATTERNS_COMPILED = MappingProxyType({
+    name: re.compile(
+        pattern,
+        re.DOTALL | re.IGNORECASE if name in _MCP_PATTERN_DOTALL else re.IGNORECASE,
+    )
+    for name, pattern in MCP_PATTERNS.items()
+})
 
 # ============================================================================
 # COMPRESSION (Phase 3 - Compression de dernier recours)
 # ============================================================================
-DEFAULT_COMPRESSION_CONFIG = {
+DEFAULT_COMPRESSION_CONFIG = MappingProxyType({
     "enabled": True,
     "threshold_percentage": 85,  # Seuil pour activer le bouton de compression
     "preserve_recent_exchanges": 5,  # Nombre d'échanges à préserver
     "summary_max_tokens": 500,  # Taille max du résumé LLM
-}
+})
 
 # ============================================================================
 # COMPACTION (Phase 1 - Infrastructure de Base)
 # ============================================================================
-DEFAULT_COMPACTION_CONFIG = {
+DEFAULT_COMPACTION_CONFIG = MappingProxyType({
     "enabled": True,
     "threshold_percentage": 80,  # Seuil pour recommander la compaction
     "max_preserved_messages": 2,  # Nombre d'échanges récents à préserver
     "min_tokens_to_compact": 500,  # Minimum de tokens pour déclencher
     "min_messages_to_compact": 6,  # Minimum de messages pour déclencher
     "target_reduction_ratio": 0.60,  # Objectif de réduction (60%)
-}
+})
 
 # ============================================================================
 # MCP PHASE 3 - Configuration des Serveurs Externes
@@ -167,11 +192,11 @@ MCP_PHASE4_CONFIG = {
 # ============================================================================
 # SEUILS D'ALERTES
 # ============================================================================
-ALERT_THRESHOLDS = {
+ALERT_THRESHOLDS = MappingProxyType({
     "caution": 80,
     "warning": 90,
     "critical": 95
-}
+})
 
 # ============================================================================
 # CHEMINS
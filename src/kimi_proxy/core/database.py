@@ -1,9 +1,16 @@
 """
 Gestion de la base de données SQLite avec migrations.
 """
+import bisect
+import functools
+import itertools
+import logging
+import queue
 import sqlite3
+import threading
+import urllib.parse
 from contextlib import contextmanager
-from typing import Generator, Optional, List, Dict, Any
+from typing import Callable, Generator, Iterable, Optional, List, Dict, Any, Tuple, TypeVar
 
 from .constants import DATABASE_FILE
 
@@ -14,13 +21,65 @@ from .constants import DATABASE_FILE
 import os
 import time
 
-# Cache pour la session active en mémoire
+logger = logging.getLogger(__name__)
+
+# Cache pour la session active en mémoire: valide jusqu'à la prochaine écriture
+# sur la table sessions (invalidation explicite, pas de TTL). La génération
+# écarte le résultat d'une lecture qui a croisé une écriture.
 _cached_active_session: Optional[Dict[str, Any]] = None
-_cached_active_session_time: float = 0.0
-_ACTIVE_SESSION_CACHE_TTL = 2.0  # TTL minimal de 2 secondes
+_active_session_generation = 0
+_active_session_lock = threading.Lock()
+
+# Cache des statistiques globales de compaction (dashboard): TTL court, et
+# invalidé par les écritures sur compaction_history
+_COMPACTION_STATS_TTL = 5.0
+_compaction_stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+_compaction_stats_generation = 0
+_compaction_stats_lock = threading.Lock()
+
+_F = TypeVar("_F", bound=Callable[..., Any])
 
 # Connexion globale pour la DB SQLite en mémoire partagée
 _mem_conn: Optional[sqlite3.Connection] = None
+_MEM_DB_URI = "file:kimi_mem?mode=memory&cache=shared"
+
+# Pools de connexions inactives (LIFO) par cible: chemin du fichier DB ou URI
+# mémoire. Une connexion réutilisée garde son cache de pages et ses pragmas.
+_POOL_MAX_IDLE = 8
+_pools: Dict[str, "queue.LifoQueue[sqlite3.Connection]"] = {}
+_pools_lock = threading.Lock()
+
+# PRAGMA optimize (mise à jour des statistiques du planificateur): à la
+# fermeture de chaque connexion et, les connexions poolées vivant longtemps,
+# tous les N emprunts
+_OPTIMIZE_EVERY_CHECKOUTS = 1000
+_checkout_counter = itertools.count(1)
+
+# Pragmas de portée connexion pour la DB fichier (à réappliquer à chaque
+# connexion). Le mode WAL, lui, est persistant: posé une fois à l'init.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",  # ~64 Mo de cache de pages
+    "PRAGMA mmap_size=268435456",  # 256 Mo
+    "PRAGMA busy_timeout=5000",
+)
+
+# Pools en lecture seule (mode=ro) des requêtes SELECT, par fichier DB
+_READER_POOL_PREFIX = "ro:"
+
+# Écritures sérialisées dans le processus (réentrant: un écrivain peut en
+# appeler un autre)
+_writer_lock = threading.RLock()
+
+# Taille du cache de statements préparés par connexion (128 par défaut). Les
+# connexions poolées vivent longtemps et servent tous les modules: le
+# cache doit contenir tous les textes SQL distincts sans éviction.
+_CACHED_STATEMENTS = 256
+
+# Fichiers DB déjà passés en WAL par ce processus (le mode est persistant dans
+# le fichier: un seul PRAGMA journal_mode par chemin suffit)
+_wal_paths: set = set()
 
 def _should_persist() -> bool:
     try:
@@ -34,28 +93,213 @@ def _should_persist() -> bool:
         return False
 
 def _invalidate_session_cache():
-    global _cached_active_session
-    _cached_active_session = None
+    global _cached_active_session, _active_session_generation
+    with _active_session_lock:
+        _cached_active_session = None
+        _active_session_generation += 1
+
+
+def _invalidate_compaction_stats_cache():
+    global _compaction_stats_cache, _compaction_stats_generation
+    with _compaction_stats_lock:
+        _compaction_stats_cache = None
+        _compaction_stats_generation += 1
+
+
+def _invalidates_session_cache(func: _F) -> _F:
+    """
+    Décorateur des écritures sur la table sessions.
+
+    Le cache est invalidé en sortie, donc après le commit: une lecture
+    concurrente ne peut pas y remettre l'état d'avant l'écriture.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _invalidate_session_cache()
+    return wrapper  # type: ignore[return-value]
+
+
+def _configure_connection(conn: sqlite3.Connection) -> None:
+    """Applique les pragmas de concurrence/performance à une connexion fichier."""
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
+
+def _ensure_wal(conn: sqlite3.Connection, path: str) -> None:
+    """
+    Passe le fichier DB en WAL à la première connexion du processus.
+
+    Couvre aussi les accès via get_db() sans init_database() préalable
+    (scripts, changement de DATABASE_FILE): lecteurs et écrivain ne se
+    bloquent plus mutuellement.
+    """
+    if path not in _wal_paths:
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_paths.add(path)
+
+
+def _close_connection(conn: sqlite3.Connection) -> None:
+    """Ferme une connexion après un PRAGMA optimize (recommandé par SQLite)."""
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass
+    conn.close()
+
+
+def _get_pool(key: str) -> "queue.LifoQueue[sqlite3.Connection]":
+    """Retourne le pool de connexions inactives de la cible `key`."""
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(key, queue.LifoQueue(maxsize=_POOL_MAX_IDLE))
+    return pool
+
+
+def _close_pool(key: str) -> None:
+    """Ferme et oublie les connexions inactives de la cible `key`."""
+    with _pools_lock:
+        pool = _pools.pop(key, None)
+    while pool is not None:
+        try:
+            _close_connection(pool.get_nowait())
+        except queue.Empty:
+            break
+
+
+def close_db_pools() -> None:
+    """Ferme toutes les connexions inactives des pools (arrêt de l'application)."""
+    with _pools_lock:
+        keys = list(_pools)
+    for key in keys:
+        _close_pool(key)
+
+
+def _connect(persist: bool, *, pooled: bool = False) -> sqlite3.Connection:
+    """Ouvre une connexion configurée vers la DB fichier ou la DB mémoire partagée."""
+    global _mem_conn
+    # Les connexions poolées changent de thread d'un emprunt à l'autre, jamais
+    # deux threads à la fois (emprunt exclusif via get_db).
+    if persist:
+        conn = sqlite3.connect(
+            DATABASE_FILE, check_same_thread=not pooled, cached_statements=_CACHED_STATEMENTS
+        )
+        conn.row_factory = sqlite3.Row
+        _configure_connection(conn)
+        _ensure_wal(conn, DATABASE_FILE)
+        return conn
+
+    if _mem_conn is None:
+        # Nouvelle DB mémoire: les connexions poolées d'une DB précédente la
+        # maintiendraient en vie, on les ferme d'abord.
+        _close_pool(_MEM_DB_URI)
+        _mem_conn = sqlite3.connect(_MEM_DB_URI, uri=True)
+        _mem_conn.row_factory = sqlite3.Row
+        _init_database_conn(_mem_conn)
+    conn = sqlite3.connect(
+        _MEM_DB_URI, uri=True, check_same_thread=not pooled,
+        cached_statements=_CACHED_STATEMENTS,
+    )
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+@contextmanager
+def _borrow(
+    key: str, factory: Callable[[], sqlite3.Connection]
+) -> Generator[sqlite3.Connection, None, None]:
+    """
+    Emprunte une connexion au pool `key` (ou en ouvre une via `factory`) et
+    l'y remet en sortie, après rollback d'une éventuelle transaction ouverte.
+    """
+    pool = _get_pool(key)
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = factory()
+    try:
+        yield conn
+    finally:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if next(_checkout_counter) % _OPTIMIZE_EVERY_CHECKOUTS == 0:
+                conn.execute("PRAGMA optimize")
+            pool.put_nowait(conn)
+        except queue.Full:
+            _close_connection(conn)
+        except sqlite3.Error:
+            conn.close()
 
 
 @contextmanager
 def get_db() -> Generator[sqlite3.Connection, None, None]:
     """
     Context manager pour les connexions DB.
+
+    Emprunte une connexion au pool de la cible courante (ou en ouvre une) et
+    l'y remet en sortie, après rollback d'une éventuelle transaction ouverte.
     
     Yields:
         Connection SQLite avec row_factory=sqlite3.Row
     """
-    conn = get_db_connection()
-    try:
+    persist = _should_persist()
+    if not persist and _mem_conn is None:
+        _connect(False).close()  # initialise la DB mémoire (et purge le pool)
+    key = DATABASE_FILE if persist else _MEM_DB_URI
+    with _borrow(key, lambda: _connect(persist, pooled=True)) as conn:
+        yield conn
+
+
+def _connect_reader(path: str) -> sqlite3.Connection:
+    """Ouvre une connexion en lecture seule (mode=ro) sur le fichier DB."""
+    conn = sqlite3.connect(
+        f"file:{urllib.parse.quote(path)}?mode=ro", uri=True, check_same_thread=False,
+        cached_statements=_CACHED_STATEMENTS,
+    )
+    conn.row_factory = sqlite3.Row
+    _configure_connection(conn)
+    return conn
+
+
+@contextmanager
+def get_reader_db() -> Generator[sqlite3.Connection, None, None]:
+    """
+    Connexion en lecture seule pour les requêtes SELECT (dashboard, stats).
+
+    En WAL, les lecteurs ne bloquent pas l'écrivain ni ne l'attendent: ils ont
+    leur propre pool, distinct de celui des écritures. En mémoire (ou si le
+    fichier n'existe pas encore), retombe sur get_db().
+
+    Yields:
+        Connection SQLite avec row_factory=sqlite3.Row
+    """
+    path = DATABASE_FILE
+    if not _should_persist() or not os.path.exists(path):
+        with get_db() as conn:
+            yield conn
+        return
+    with _borrow(_READER_POOL_PREFIX + path, lambda: _connect_reader(path)) as conn:
+        yield conn
+
+
+@contextmanager
+def get_writer_db() -> Generator[sqlite3.Connection, None, None]:
+    """
+    Connexion d'écriture, sérialisée dans le processus, en transaction.
+
+    Un seul écrivain à la fois (verrou Python): pas d'attente busy_timeout
+    entre threads du proxy. La transaction (BEGIN IMMEDIATE) est commitée en
+    sortie, annulée sur exception.
+
+    Yields:
+        Connection SQLite avec row_factory=sqlite3.Row
+    """
+    with _writer_lock, get_db() as conn, transaction(conn):
         yield conn
-    finally:
-        if _should_persist():
-            conn.close()
-        else:
-            # En mémoire partagée, on ne ferme pas la connexion principale
-            # mais on peut fermer les connexions secondaires.
-            conn.close()
 
 
 def get_db_connection() -> sqlite3.Connection:
@@ -65,19 +309,35 @@ def get_db_connection() -> sqlite3.Connection:
     Returns:
         Connection SQLite
     """
-    global _mem_conn
-    if _should_persist():
-        conn = sqlite3.connect(DATABASE_FILE)
-        conn.row_factory = sqlite3.Row
-        return conn
-    else:
-        if _mem_conn is None:
-            _mem_conn = sqlite3.connect("file:kimi_mem?mode=memory&cache=shared", uri=True)
-            _mem_conn.row_factory = sqlite3.Row
-            _init_database_conn(_mem_conn)
-        conn = sqlite3.connect("file:kimi_mem?mode=memory&cache=shared", uri=True)
-        conn.row_factory = sqlite3.Row
-        return conn
+    return _connect(_should_persist())
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Generator[sqlite3.Connection, None, None]:
+    """
+    Regroupe plusieurs écritures dans une seule transaction (un seul commit).
+
+    BEGIN IMMEDIATE prend le verrou d'écriture dès l'entrée: pas d'échec
+    SQLITE_BUSY en cours de route lors du passage lecture → écriture.
+    Commit en sortie, rollback sur exception. Si une transaction est déjà
+    ouverte sur la connexion, elle est réutilisée telle quelle.
+
+    Args:
+        conn: Connexion SQLite (typiquement issue de get_db())
+
+    Yields:
+        La même connexion
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
 
 
 def init_database():
@@ -90,360 +350,395 @@ def init_database():
         return
 
     conn = sqlite3.connect(DATABASE_FILE)
+    # WAL: lecteurs et écrivain concurrents, commits sans fsync systématique.
+    # Persistant dans le fichier, inutile (et sans effet) en mémoire partagée.
+    _configure_connection(conn)
+    _ensure_wal(conn, DATABASE_FILE)
     _init_database_conn(conn)
-    conn.close()
+    _close_connection(conn)
     print("✅ Base de données SQLite initialisée")
 
 
-def _init_database_conn(conn: sqlite3.Connection):
-    """Initialise la connexion passée en paramètre."""
-    cursor = conn.cursor()
-    
-    # Table providers (cache configuration)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS providers (
-            key TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            type TEXT NOT NULL,
-            base_url TEXT NOT NULL,
-            api_key TEXT
-        )
-    """)
-    
-    # Table sessions
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            provider TEXT DEFAULT 'managed:kimi-code',
-            model TEXT,
-            external_session_id TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            is_active BOOLEAN DEFAULT 0
-        )
-    """)
-    
-    # Table metrics
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            estimated_tokens INTEGER NOT NULL,
-            percentage REAL NOT NULL,
-            content_preview TEXT,
-            prompt_tokens INTEGER DEFAULT 0,
-            completion_tokens INTEGER DEFAULT 0,
-            is_estimated BOOLEAN DEFAULT 1,
-            source TEXT DEFAULT 'proxy',
-            memory_tokens INTEGER DEFAULT 0,
-            chat_tokens INTEGER DEFAULT 0,
-            memory_ratio REAL DEFAULT 0,
-            FOREIGN KEY (session_id) REFERENCES sessions(id)
-        )
-    """)
+# Schéma complet (tables et index), exécuté en un seul script à l'initialisation
+# Colonnes générées disponibles depuis SQLite 3.31: tokens_saved et
+# compaction_ratio sont alors calculés par SQLite à l'insertion, toujours
+# cohérents avec tokens_before/tokens_after
+_SQLITE_HAS_GENERATED_COLUMNS = sqlite3.sqlite_version_info >= (3, 31)
 
-    
-    # Table masked_content (Sanitizer Phase 1)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS masked_content (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            content_hash TEXT UNIQUE NOT NULL,
-            original_content TEXT NOT NULL,
-            preview TEXT NOT NULL,
-            file_path TEXT NOT NULL,
-            tags TEXT,
-            token_count INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Table memory_metrics (MCP Phase 2)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS memory_metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            memory_tokens INTEGER DEFAULT 0,
-            chat_tokens INTEGER DEFAULT 0,
-            memory_ratio REAL DEFAULT 0,
-            FOREIGN KEY (session_id) REFERENCES sessions(id)
-        )
-    """)
-    
-    # Table memory_segments (détail MCP Phase 2)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS memory_segments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER NOT NULL,
-            metric_id INTEGER,
-            segment_type TEXT,
-            content_preview TEXT,
-            token_count INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (session_id) REFERENCES sessions(id)
-        )
-    """)
-    
-    # Table compression_log (Phase 3)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS compression_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            original_tokens INTEGER NOT NULL,
-            compressed_tokens INTEGER NOT NULL,
-            compression_ratio REAL NOT NULL,
-            summary_preview TEXT,
-            FOREIGN KEY (session_id) REFERENCES sessions(id)
-        )
-    """)
-    
-    # Table compaction_history (Phase 1 Context Compaction)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS compaction_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            tokens_before INTEGER NOT NULL,
-            tokens_after INTEGER NOT NULL,
-            tokens_saved INTEGER NOT NULL,
-            preserved_messages INTEGER NOT NULL,
-            summarized_messages INTEGER NOT NULL,
-            compaction_ratio REAL NOT NULL,
-            trigger_reason TEXT,
-            FOREIGN KEY (session_id) REFERENCES sessions(id)
-        )
-    """)
-    
-    # Table mcp_memory_entries (Phase 3 MCP Memory Standardisée)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS mcp_memory_entries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER NOT NULL,
-            memory_type TEXT DEFAULT 'episodic',
-            content_hash TEXT UNIQUE NOT NULL,
-            content_preview TEXT NOT NULL,
-            full_content TEXT NOT NULL,
-            token_count INTEGER DEFAULT 0,
-            access_count INTEGER DEFAULT 0,
-            last_accessed_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            embedding_id TEXT,
-            metadata TEXT,
-            FOREIGN KEY (session_id) REFERENCES sessions(id)
+
+def _compaction_history_ddl(table: str) -> str:
+    """CREATE TABLE de compaction_history (nom paramétrable pour la reconstruction)."""
+    if _SQLITE_HAS_GENERATED_COLUMNS:
+        tokens_saved = "INTEGER NOT NULL GENERATED ALWAYS AS (tokens_before - tokens_after) STORED"
+        compaction_ratio = (
+            "REAL NOT NULL GENERATED ALWAYS AS (CASE WHEN tokens_before > 0 "
+            "THEN (tokens_before - tokens_after) * 100.0 / tokens_before ELSE 0 END) STORED"
         )
-    """)
-    
+    else:
+        tokens_saved = "INTEGER NOT NULL"
+        compaction_ratio = "REAL NOT NULL"
+    return f"""CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    tokens_before INTEGER NOT NULL,
+    tokens_after INTEGER NOT NULL,
+    tokens_saved {tokens_saved},
+    preserved_messages INTEGER NOT NULL,
+    summarized_messages INTEGER NOT NULL,
+    compaction_ratio {compaction_ratio},
+    trigger_reason TEXT,
+    FOREIGN KEY (session_id) REFERENCES sessions(id)
+)"""
+
+
+_COMPACTION_HISTORY_INDEX_DDL = (
+    "CREATE INDEX IF NOT EXISTS idx_compaction_session "
+    "ON compaction_history(session_id, timestamp DESC)"
+)
+
+_SCHEMA_DDL = """
+-- Table providers (cache configuration)
+CREATE TABLE IF NOT EXISTS providers (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    base_url TEXT NOT NULL,
+    api_key TEXT
+);
+
+-- Table sessions
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    provider TEXT DEFAULT 'managed:kimi-code',
+    model TEXT,
+    external_session_id TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active BOOLEAN DEFAULT 0
+);
+-- Session active (au plus une ligne): index partiel, quasi gratuit à maintenir.
+-- Non UNIQUE: set_active_session bascule deux lignes dans un même UPDATE et
+-- SQLite vérifie l'unicité ligne par ligne; une ancienne base pourrait aussi
+-- contenir plusieurs sessions actives.
+CREATE INDEX IF NOT EXISTS idx_sessions_active ON sessions(is_active) WHERE is_active = 1;
+
+-- Table metrics
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    estimated_tokens INTEGER NOT NULL,
+    percentage REAL NOT NULL,
+    content_preview TEXT,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    is_estimated BOOLEAN DEFAULT 1,
+    source TEXT DEFAULT 'proxy',
+    memory_tokens INTEGER DEFAULT 0,
+    chat_tokens INTEGER DEFAULT 0,
+    memory_ratio REAL DEFAULT 0,
+    FOREIGN KEY (session_id) REFERENCES sessions(id)
+);
+-- Filtre par session + tri chronologique inverse (dernière métrique, métriques récentes)
+CREATE INDEX IF NOT EXISTS idx_metrics_session_ts ON metrics(session_id, timestamp DESC, id DESC);
+DROP INDEX IF EXISTS idx_metrics_session;
+
+-- Table masked_content (Sanitizer Phase 1)
+CREATE TABLE IF NOT EXISTS masked_content (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content_hash TEXT UNIQUE NOT NULL,
+    original_content TEXT NOT NULL,
+    preview TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    tags TEXT,
+    token_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table memory_metrics (MCP Phase 2)
+CREATE TABLE IF NOT EXISTS memory_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    memory_tokens INTEGER DEFAULT 0,
+    chat_tokens INTEGER DEFAULT 0,
+    memory_ratio REAL DEFAULT 0,
+    FOREIGN KEY (session_id) REFERENCES sessions(id)
+);
+CREATE INDEX IF NOT EXISTS idx_memory_metrics_session ON memory_metrics(session_id, timestamp DESC);
+
+-- Table memory_segments (détail MCP Phase 2)
+CREATE TABLE IF NOT EXISTS memory_segments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    metric_id INTEGER,
+    segment_type TEXT,
+    content_preview TEXT,
+    token_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES sessions(id)
+);
+CREATE INDEX IF NOT EXISTS idx_memory_segments_session ON memory_segments(session_id);
+
+-- Table compression_log (Phase 3)
+CREATE TABLE IF NOT EXISTS compression_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    original_tokens INTEGER NOT NULL,
+    compressed_tokens INTEGER NOT NULL,
+    compression_ratio REAL NOT NULL,
+    summary_preview TEXT,
+    FOREIGN KEY (session_id) REFERENCES sessions(id)
+);
+CREATE INDEX IF NOT EXISTS idx_compression_log_session ON compression_log(session_id, timestamp DESC);
+
+-- Table compaction_history (Phase 1 Context Compaction)
+""" + _compaction_history_ddl("compaction_history") + """;
+""" + _COMPACTION_HISTORY_INDEX_DDL + """;
+-- Cumuls par session désormais tenus dans sessions (total_tokens_saved)
+DROP INDEX IF EXISTS idx_compaction_session_tokens;
+
+-- Table mcp_memory_entries (Phase 3 MCP Memory Standardisée)
+CREATE TABLE IF NOT EXISTS mcp_memory_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    memory_type TEXT DEFAULT 'episodic',
+    content_hash TEXT UNIQUE NOT NULL,
+    content_preview TEXT NOT NULL,
+    full_content TEXT NOT NULL,
+    token_count INTEGER DEFAULT 0,
+    access_count INTEGER DEFAULT 0,
+    last_accessed_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    embedding_id TEXT,
+    metadata TEXT,
+    FOREIGN KEY (session_id) REFERENCES sessions(id)
+);
+
+-- Index pour performance
+CREATE INDEX IF NOT EXISTS idx_memory_type ON mcp_memory_entries(memory_type);
+CREATE INDEX IF NOT EXISTS idx_memory_session ON mcp_memory_entries(session_id);
+CREATE INDEX IF NOT EXISTS idx_memory_hash ON mcp_memory_entries(content_hash);
+CREATE INDEX IF NOT EXISTS idx_memory_access ON mcp_memory_entries(access_count);
+
+-- Table mcp_compression_results (Phase 3 Compression MCP)
+CREATE TABLE IF NOT EXISTS mcp_compression_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    original_tokens INTEGER NOT NULL,
+    compressed_tokens INTEGER NOT NULL,
+    compression_ratio REAL NOT NULL,
+    algorithm TEXT DEFAULT 'zlib',
+    compressed_content TEXT,
+    decompression_time_ms REAL DEFAULT 0.0,
+    quality_score REAL DEFAULT 0.0,
+    FOREIGN KEY (session_id) REFERENCES sessions(id)
+);
+CREATE INDEX IF NOT EXISTS idx_compression_results_session ON mcp_compression_results(session_id);
+
+-- Table mcp_routing_decisions (Phase 3 Routage Optimisé)
+CREATE TABLE IF NOT EXISTS mcp_routing_decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    original_provider TEXT NOT NULL,
+    selected_provider TEXT NOT NULL,
+    original_model TEXT,
+    selected_model TEXT,
+    required_context INTEGER NOT NULL,
+    available_context INTEGER NOT NULL,
+    context_remaining INTEGER NOT NULL,
+    confidence_score REAL NOT NULL,
+    reason TEXT,
+    fallback_triggered BOOLEAN DEFAULT 0,
+    estimated_cost REAL DEFAULT 0.0,
+    FOREIGN KEY (session_id) REFERENCES sessions(id)
+);
+CREATE INDEX IF NOT EXISTS idx_routing_session ON mcp_routing_decisions(session_id);
+"""
 
 
-    # Index pour performance
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_memory_type ON mcp_memory_entries(memory_type)
-    """)
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_memory_session ON mcp_memory_entries(session_id)
-    """)
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_memory_hash ON mcp_memory_entries(content_hash)
-    """)
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_memory_access ON mcp_memory_entries(access_count)
-    """)
-    
-    # Table mcp_compression_results (Phase 3 Compression MCP)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS mcp_compression_results (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            original_tokens INTEGER NOT NULL,
-            compressed_tokens INTEGER NOT NULL,
-            compression_ratio REAL NOT NULL,
-            algorithm TEXT DEFAULT 'zlib',
-            compressed_content TEXT,
-            decompression_time_ms REAL DEFAULT 0.0,
-            quality_score REAL DEFAULT 0.0,
-            FOREIGN KEY (session_id) REFERENCES sessions(id)
-        )
-    """)
-    
-    # Table mcp_routing_decisions (Phase 3 Routage Optimisé)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS mcp_routing_decisions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            original_provider TEXT NOT NULL,
-            selected_provider TEXT NOT NULL,
-            original_model TEXT,
-            selected_model TEXT,
-            required_context INTEGER NOT NULL,
-            available_context INTEGER NOT NULL,
-            context_remaining INTEGER NOT NULL,
-            confidence_score REAL NOT NULL,
-            reason TEXT,
-            fallback_triggered BOOLEAN DEFAULT 0,
-            estimated_cost REAL DEFAULT 0.0,
-            FOREIGN KEY (session_id) REFERENCES sessions(id)
-        )
-    """)
-    
+def _init_database_conn(conn: sqlite3.Connection):
+    """Initialise la connexion passée en paramètre."""
+    conn.executescript(_SCHEMA_DDL)
     conn.commit()
     
     # Migrations (ajout de colonnes si elles n'existent pas)
-    _run_migrations(cursor, conn)
+    _run_migrations(conn)
+    _migrate_compaction_history_generated(conn)
+
+
+# Colonnes ajoutées par migration (table, colonne, définition), dans l'ordre
+# historique des migrations
+_MIGRATION_COLUMNS = (
+    ("metrics", "source", "TEXT DEFAULT 'proxy'"),
+    ("sessions", "model", "TEXT"),
+    ("sessions", "external_session_id", "TEXT"),
+    ("masked_content", "tags", "TEXT"),
+    ("masked_content", "token_count", "INTEGER DEFAULT 0"),
+    # Colonnes mémoire dans metrics (Phase 2 MCP)
+    ("metrics", "memory_tokens", "INTEGER DEFAULT 0"),
+    ("metrics", "chat_tokens", "INTEGER DEFAULT 0"),
+    ("metrics", "memory_ratio", "REAL DEFAULT 0"),
+    # Phase 1 Context Compaction
+    ("sessions", "reserved_tokens", "INTEGER DEFAULT 0"),
+    ("sessions", "compaction_count", "INTEGER DEFAULT 0"),
+    ("sessions", "last_compaction_at", "TIMESTAMP"),
+    # Phase 2 - Auto-compaction par session
+    ("sessions", "auto_compaction_enabled", "BOOLEAN DEFAULT 1"),
+    ("sessions", "auto_compaction_threshold", "REAL DEFAULT 0.85"),
+    ("sessions", "consecutive_auto_compactions", "INTEGER DEFAULT 0"),
+    # Cumul des tokens économisés, tenu à jour par save_compaction_history
+    ("sessions", "total_tokens_saved", "INTEGER DEFAULT 0"),
+)
+
+# Remplissage initial des colonnes dérivées, exécuté dans la transaction de
+# migration quand la colonne vient d'être ajoutée
+_MIGRATION_BACKFILLS = {
+    ("sessions", "total_tokens_saved"): """UPDATE sessions SET total_tokens_saved = (
+        SELECT COALESCE(SUM(tokens_saved), 0) FROM compaction_history
+        WHERE session_id = sessions.id
+    )""",
+}
+
+
+def _run_migrations(conn: sqlite3.Connection):
+    """
+    Exécute les migrations de schéma.
 
+    Les colonnes existantes sont lues une fois par table (PRAGMA table_info);
+    seules les colonnes manquantes sont ajoutées, dans une même transaction.
+    """
+    existing_columns: Dict[str, set] = {}
+    missing = []
+    for table, column, definition in _MIGRATION_COLUMNS:
+        if table not in existing_columns:
+            existing_columns[table] = {
+                row[1] for row in conn.execute(f"PRAGMA table_info({table})")
+            }
+        if column not in existing_columns[table]:
+            missing.append((table, column, definition))
 
-def _run_migrations(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
-    """Exécute les migrations de schéma."""
-    
-    # Migration: ajoute la colonne source dans metrics
-    try:
-        cursor.execute("ALTER TABLE metrics ADD COLUMN source TEXT DEFAULT 'proxy'")
-        conn.commit()
-        print("   Migration: colonne 'source' ajoutée à metrics")
-    except sqlite3.OperationalError:
-        pass  # Colonne existe déjà
-    
-    # Migration: ajoute la colonne model dans sessions
-    try:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN model TEXT")
-        conn.commit()
-        print("   Migration: colonne 'model' ajoutée à sessions")
-    except sqlite3.OperationalError:
-        pass
+    if not missing:
+        return
 
-    # Migration: ajoute la colonne external_session_id dans sessions
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
     try:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN external_session_id TEXT")
+        for table, column, definition in missing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        for table, column, _ in missing:
+            backfill = _MIGRATION_BACKFILLS.get((table, column))
+            if backfill:
+                conn.execute(backfill)
         conn.commit()
-        print("   Migration: colonne 'external_session_id' ajoutée à sessions")
-    except sqlite3.OperationalError:
-        pass
-    
-    # Migration: ajoute les colonnes tags et token_count dans masked_content
-    try:
-        cursor.execute("ALTER TABLE masked_content ADD COLUMN tags TEXT")
-        conn.commit()
-        print("   Migration: colonne 'tags' ajoutée à masked_content")
-    except sqlite3.OperationalError:
-        pass
-    
-    try:
-        cursor.execute("ALTER TABLE masked_content ADD COLUMN token_count INTEGER DEFAULT 0")
-        conn.commit()
-        print("   Migration: colonne 'token_count' ajoutée à masked_content")
-    except sqlite3.OperationalError:
-        pass
-    
-    # Migration: ajoute les colonnes mémoire dans metrics (Phase 2 MCP)
-    try:
-        cursor.execute("ALTER TABLE metrics ADD COLUMN memory_tokens INTEGER DEFAULT 0")
-        conn.commit()
-        print("   Migration: colonne 'memory_tokens' ajoutée à metrics")
-    except sqlite3.OperationalError:
-        pass
-    
-    try:
-        cursor.execute("ALTER TABLE metrics ADD COLUMN chat_tokens INTEGER DEFAULT 0")
-        conn.commit()
-        print("   Migration: colonne 'chat_tokens' ajoutée à metrics")
-    except sqlite3.OperationalError:
-        pass
-    
-    try:
-        cursor.execute("ALTER TABLE metrics ADD COLUMN memory_ratio REAL DEFAULT 0")
-        conn.commit()
-        print("   Migration: colonne 'memory_ratio' ajoutée à metrics")
-    except sqlite3.OperationalError:
-        pass
-    
-    # Migrations Phase 1 Context Compaction
-    try:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN reserved_tokens INTEGER DEFAULT 0")
-        conn.commit()
-        print("   Migration: colonne 'reserved_tokens' ajoutée à sessions")
-    except sqlite3.OperationalError:
-        pass
-    
-    try:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN compaction_count INTEGER DEFAULT 0")
-        conn.commit()
-        print("   Migration: colonne 'compaction_count' ajoutée à sessions")
-    except sqlite3.OperationalError:
-        pass
-    
-    try:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN last_compaction_at TIMESTAMP")
-        conn.commit()
-        print("   Migration: colonne 'last_compaction_at' ajoutée à sessions")
-    except sqlite3.OperationalError:
-        pass
-    
-    # Migrations Phase 2 - Auto-compaction par session
-    try:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN auto_compaction_enabled BOOLEAN DEFAULT 1")
-        conn.commit()
-        print("   Migration: colonne 'auto_compaction_enabled' ajoutée à sessions")
-    except sqlite3.OperationalError:
-        pass
-    
-    try:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN auto_compaction_threshold REAL DEFAULT 0.85")
-        conn.commit()
-        print("   Migration: colonne 'auto_compaction_threshold' ajoutée à sessions")
-    except sqlite3.OperationalError:
-        pass
-    
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    for table, column, _ in missing:
+        print(f"   Migration: colonne '{column}' ajoutée à {table}")
+
+
+def _migrate_compaction_history_generated(conn: sqlite3.Connection):
+    """
+    Convertit tokens_saved et compaction_ratio en colonnes générées.
+
+    ALTER TABLE ne sait pas transformer une colonne existante: la table est
+    recréée et les lignes recopiées (économie et ratio recalculés par SQLite).
+    """
+    if not _SQLITE_HAS_GENERATED_COLUMNS:
+        return
+    # table_xinfo: hidden vaut 2 (VIRTUAL) ou 3 (STORED) pour une colonne générée
+    hidden = {row[1]: row[6] for row in conn.execute("PRAGMA table_xinfo(compaction_history)")}
+    if hidden.get("tokens_saved") != 0:
+        return
+
+    copied = ("id, session_id, timestamp, tokens_before, tokens_after, "
+              "preserved_messages, summarized_messages, trigger_reason")
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
     try:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN consecutive_auto_compactions INTEGER DEFAULT 0")
+        conn.execute(_compaction_history_ddl("compaction_history_new"))
+        conn.execute(
+            f"INSERT INTO compaction_history_new ({copied}) SELECT {copied} FROM compaction_history"
+        )
+        conn.execute("DROP TABLE compaction_history")
+        conn.execute("ALTER TABLE compaction_history_new RENAME TO compaction_history")
+        conn.execute(_COMPACTION_HISTORY_INDEX_DDL)
         conn.commit()
-        print("   Migration: colonne 'consecutive_auto_compactions' ajoutée à sessions")
-    except sqlite3.OperationalError:
-        pass
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    print("   Migration: colonnes générées pour compaction_history")
+
+
+def _fetchone_dict(cursor: sqlite3.Cursor) -> Optional[Dict[str, Any]]:
+    """Retourne la ligne suivante du curseur en dict, ou None."""
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([column[0] for column in cursor.description], row))
+
+
+def _fetchall_dicts(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    """
+    Retourne les lignes restantes du curseur en dicts.
+
+    Les noms de colonnes sont lus une fois par requête: plus rapide que
+    `dict(row)` sur chaque sqlite3.Row (résolution des clés ligne par ligne).
+    """
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
 
 
 # ============================================================================
 # Opérations CRUD pour Sessions
 # ============================================================================
 
+# INSERT ... RETURNING disponible depuis SQLite 3.35
+_SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+_INSERT_SESSION_SQL = """INSERT INTO sessions (name, provider, model, external_session_id, is_active)
+               VALUES (?, ?, ?, ?, 1)"""
+
+
 def get_active_session() -> Optional[Dict[str, Any]]:
-    """Récupère la session active (avec cache en mémoire TTL)."""
-    global _cached_active_session, _cached_active_session_time
-    now = time.time()
-    if _cached_active_session is not None and (now - _cached_active_session_time) < _ACTIVE_SESSION_CACHE_TTL:
-        return _cached_active_session
+    """Récupère la session active (cache mémoire invalidé à chaque écriture de session)."""
+    global _cached_active_session
+    cached = _cached_active_session
+    if cached is not None:
+        return cached
 
+    generation = _active_session_generation
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
+        cursor = conn.execute(
             "SELECT * FROM sessions WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
         )
-        row = cursor.fetchone()
-        res = dict(row) if row else None
-        _cached_active_session = res
-        _cached_active_session_time = now
-        return res
+        res = _fetchone_dict(cursor)
+    with _active_session_lock:
+        if generation == _active_session_generation:
+            _cached_active_session = res
+    return res
 
 
 def get_session_by_id(session_id: int) -> Optional[Dict[str, Any]]:
     """Récupère une session par son ID."""
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        cursor = conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
+        return _fetchone_dict(cursor)
 
 
 def get_all_sessions() -> List[Dict[str, Any]]:
     """Récupère toutes les sessions."""
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM sessions ORDER BY created_at DESC")
-        return [dict(row) for row in cursor.fetchall()]
+        cursor = conn.execute("SELECT * FROM sessions ORDER BY created_at DESC")
+        return _fetchall_dicts(cursor)
 
 
+@_invalidates_session_cache
 def create_session(
     name: str,
     provider: str = "managed:kimi-code",
@@ -451,108 +746,110 @@ def create_session(
     external_session_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """Crée une nouvelle session et la rend active."""
-    _invalidate_session_cache()
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # Désactive toutes les sessions
-        cursor.execute("UPDATE sessions SET is_active = 0")
-        
-        # Insère la nouvelle session
-        if model:
-            cursor.execute(
-                """INSERT INTO sessions (name, provider, model, external_session_id, is_active)
-                   VALUES (?, ?, ?, ?, 1)""",
-                (name, provider, model, external_session_id)
-            )
-        else:
-            cursor.execute(
-                """INSERT INTO sessions (name, provider, external_session_id, is_active)
-                   VALUES (?, ?, ?, 1)""",
-                (name, provider, external_session_id)
-            )
-        
-        session_id = cursor.lastrowid
-        conn.commit()
+    with get_db() as conn, transaction(conn):
+        # Désactive la session active (seules les lignes actives sont réécrites)
+        conn.execute("UPDATE sessions SET is_active = 0 WHERE is_active = 1")
         
-        cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
-        return dict(cursor.fetchone())
+        # Insère la nouvelle session (un seul statement préparé; modèle vide → NULL)
+        params = (name, provider, model or None, external_session_id)
+        if _SQLITE_HAS_RETURNING:
+            # Ligne complète (valeurs par défaut comprises) renvoyée par l'INSERT;
+            # curseur épuisé avant le commit de la transaction
+            cursor = conn.execute(_INSERT_SESSION_SQL + " RETURNING *", params)
+            return _fetchall_dicts(cursor)[0]
 
+        cursor = conn.execute(_INSERT_SESSION_SQL, params)
+        cursor = conn.execute("SELECT * FROM sessions WHERE id = ?", (cursor.lastrowid,))
+        return _fetchone_dict(cursor)  # type: ignore[return-value]
 
+
+@_invalidates_session_cache
 def update_session_model(session_id: int, model: str) -> bool:
     """Met à jour le modèle d'une session."""
-    _invalidate_session_cache()
     with get_db() as conn:
-        cursor = conn.cursor()
         try:
-            cursor.execute(
+            cursor = conn.execute(
                 "UPDATE sessions SET model = ? WHERE id = ?",
                 (model, session_id)
             )
             conn.commit()
             return cursor.rowcount > 0
         except Exception as e:
-            print(f"⚠️ Erreur mise à jour modèle session: {e}")
+            logger.warning("Erreur mise à jour modèle session: %s", e)
             return False
 
 
+@_invalidates_session_cache
 def update_session_external_id(session_id: int, external_session_id: Optional[str]) -> bool:
     """Met à jour l'identifiant de session externe d'une session."""
-    _invalidate_session_cache()
     normalized_external_id = external_session_id.strip() if isinstance(external_session_id, str) else None
     if normalized_external_id == "":
         normalized_external_id = None
 
     with get_db() as conn:
-        cursor = conn.cursor()
         try:
-            cursor.execute(
+            cursor = conn.execute(
                 "UPDATE sessions SET external_session_id = ? WHERE id = ?",
                 (normalized_external_id, session_id)
             )
             conn.commit()
             return cursor.rowcount > 0
         except Exception as e:
-            print(f"⚠️ Erreur mise à jour external_session_id session: {e}")
+            logger.warning("Erreur mise à jour external_session_id session: %s", e)
             return False
 
 
+@_invalidates_session_cache
 def update_session_first_prompt(session_id: int, prompt: str):
     """Met à jour le nom de la session avec le premier prompt si c'est un nom générique."""
-    _invalidate_session_cache()
+    short_name = prompt[:50] + "..." if len(prompt) > 50 else prompt
     with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT name FROM sessions WHERE id = ?", (session_id,))
-        row = cursor.fetchone()
-        
-        if row and (row[0].startswith("Session") or row[0] == "Session par défaut"):
-            short_name = prompt[:50] + "..." if len(prompt) > 50 else prompt
-            cursor.execute(
-                "UPDATE sessions SET name = ? WHERE id = ?",
-                (short_name, session_id)
-            )
+        # Condition portée par l'UPDATE (nom générique "Session..." y compris
+        # "Session par défaut"); GLOB est sensible à la casse comme startswith
+        cursor = conn.execute(
+            "UPDATE sessions SET name = ? WHERE id = ? AND name GLOB 'Session*'",
+            (short_name, session_id)
+        )
+        if cursor.rowcount:
             conn.commit()
 
 
+@_invalidates_session_cache
 def set_active_session(session_id: int) -> bool:
     """Active une session spécifique."""
-    _invalidate_session_cache()
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("UPDATE sessions SET is_active = 0")
-        cursor.execute(
-            "UPDATE sessions SET is_active = 1 WHERE id = ?",
-            (session_id,)
+    with get_db() as conn, transaction(conn):
+        # Une seule passe: ne touche que l'ancienne session active et la cible
+        conn.execute(
+            """UPDATE sessions SET is_active = CASE WHEN id = ? THEN 1 ELSE 0 END
+               WHERE is_active = 1 OR id = ?""",
+            (session_id, session_id)
         )
-        conn.commit()
-        return cursor.rowcount > 0
+        return conn.execute(
+            "SELECT 1 FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone() is not None
 
 
 # ============================================================================
 # Opérations pour Metrics
 # ============================================================================
 
+# Requêtes du chemin chaud des métriques (une requête proxy = un INSERT puis un
+# UPDATE). Même texte SQL à chaque appel: le cache de statements préparés des
+# connexions poolées évite de les recompiler.
+_INSERT_METRIC_SQL = """INSERT INTO metrics 
+                (session_id, estimated_tokens, percentage, content_preview, 
+                 is_estimated, source, memory_tokens, chat_tokens, memory_ratio)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_UPDATE_METRIC_REAL_TOKENS_SQL = """UPDATE metrics 
+               SET estimated_tokens = ?, 
+                   prompt_tokens = ?, 
+                   completion_tokens = ?,
+                   percentage = ?,
+                   is_estimated = 0
+               WHERE id = ?"""
+
+
 def save_metric(
     session_id: int,
     tokens: int,
@@ -566,12 +863,8 @@ def save_metric(
 ) -> int:
     """Sauvegarde une métrique et retourne son ID."""
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """INSERT INTO metrics 
-                (session_id, estimated_tokens, percentage, content_preview, 
-                 is_estimated, source, memory_tokens, chat_tokens, memory_ratio)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        cursor = conn.execute(
+            _INSERT_METRIC_SQL,
             (session_id, tokens, percentage, preview[:200], 
              is_estimated, source, memory_tokens, chat_tokens, memory_ratio)
         )
@@ -579,6 +872,30 @@ def save_metric(
         return cursor.lastrowid  # type: ignore
 
 
+def save_metrics_many(rows: Iterable[Tuple[Any, ...]]) -> int:
+    """
+    Sauvegarde plusieurs métriques en une seule transaction.
+
+    Args:
+        rows: Tuples dans l'ordre des paramètres de save_metric
+            (session_id, tokens, percentage, preview, is_estimated, source,
+            memory_tokens, chat_tokens, memory_ratio)
+
+    Returns:
+        Nombre de métriques insérées
+    """
+    params = [
+        (row[0], row[1], row[2], row[3][:200], *row[4:])
+        for row in rows
+    ]
+    if not params:
+        return 0
+    with get_db() as conn:
+        conn.executemany(_INSERT_METRIC_SQL, params)
+        conn.commit()
+    return len(params)
+
+
 def update_metric_with_real_tokens(
     metric_id: int,
     prompt_tokens: int,
@@ -590,15 +907,8 @@ def update_metric_with_real_tokens(
     percentage = (total_tokens / max_context) * 100 if max_context > 0 else 0
     
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """UPDATE metrics 
-               SET estimated_tokens = ?, 
-                   prompt_tokens = ?, 
-                   completion_tokens = ?,
-                   percentage = ?,
-                   is_estimated = 0
-               WHERE id = ?""",
+        cursor = conn.execute(
+            _UPDATE_METRIC_REAL_TOKENS_SQL,
             (total_tokens, prompt_tokens, completion_tokens, percentage, metric_id)
         )
         conn.commit()
@@ -611,6 +921,15 @@ def update_metric_with_real_tokens(
     }
 
 
+# Cumul facturé par métrique (cf. get_session_cumulative_tokens): prompt_tokens
+# réels si disponibles, sinon estimated_tokens; completion_tokens en sortie.
+_CUMULATIVE_INPUT_SQL = (
+    "COALESCE(SUM(CASE WHEN COALESCE(prompt_tokens, 0) > 0 THEN prompt_tokens "
+    "ELSE COALESCE(estimated_tokens, 0) END), 0)"
+)
+_CUMULATIVE_OUTPUT_SQL = "COALESCE(SUM(COALESCE(completion_tokens, 0)), 0)"
+
+
 def get_session_total_tokens(session_id: int) -> Dict[str, int]:
     """
     Récupère les tokens de la DERNIÈRE requête uniquement.
@@ -623,9 +942,8 @@ def get_session_total_tokens(session_id: int) -> Dict[str, int]:
     Pour le cumul (facturation), utiliser get_session_cumulative_tokens().
     """
     with get_db() as conn:
-        cursor = conn.cursor()
         # Prend UNIQUEMENT la dernière métrique (plus récente)
-        cursor.execute("""
+        cursor = conn.execute("""
             SELECT 
                 estimated_tokens,
                 prompt_tokens,
@@ -670,36 +988,13 @@ def get_session_cumulative_tokens(session_id: int) -> Dict[str, int]:
     - Total: Input + Output (total facturé)
     """
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                estimated_tokens,
-                prompt_tokens,
-                completion_tokens,
-                is_estimated
-            FROM metrics 
-            WHERE session_id = ? 
-            ORDER BY timestamp ASC
-        """, (session_id,))
-        
-        rows = cursor.fetchall()
-    
-    total_input = 0
-    total_output = 0
-    
-    for row in rows:
-        estimated = row[0] or 0
-        prompt = row[1] or 0
-        completion = row[2] or 0
-        
-        # Pour l'input: utilise prompt_tokens si disponible, sinon estimated_tokens
-        if prompt > 0:
-            total_input += prompt
-        else:
-            total_input += estimated
-        
-        # Pour l'output: toujours completion_tokens
-        total_output += completion
+        # Sommes calculées par SQLite (une ligne en retour, quel que soit l'historique)
+        cursor = conn.execute(
+            f"SELECT {_CUMULATIVE_INPUT_SQL}, {_CUMULATIVE_OUTPUT_SQL} "
+            "FROM metrics WHERE session_id = ?",
+            (session_id,),
+        )
+        total_input, total_output = cursor.fetchone()
     
     return {
         "input_tokens": total_input,
@@ -711,36 +1006,44 @@ def get_session_cumulative_tokens(session_id: int) -> Dict[str, int]:
 def get_session_stats(session_id: int) -> Dict[str, Any]:
     """Récupère les statistiques d'une session."""
     with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """SELECT 
+        # Agrégats et cumul des tokens en un seul passage sur les métriques
+        cursor = conn.execute(
+            f"""SELECT 
                 COUNT(*) as total_requests,
                 MAX(estimated_tokens) as max_tokens,
-                AVG(estimated_tokens) as avg_tokens
+                AVG(estimated_tokens) as avg_tokens,
+                {_CUMULATIVE_INPUT_SQL} as cumulative_input,
+                {_CUMULATIVE_OUTPUT_SQL} as cumulative_output
                FROM metrics WHERE session_id = ?""",
             (session_id,)
         )
-        stats = dict(cursor.fetchone())
+        row = cursor.fetchone()
+        stats = {
+            "total_requests": row["total_requests"],
+            "max_tokens": row["max_tokens"],
+            "avg_tokens": row["avg_tokens"],
+        }
+        total_input = row["cumulative_input"]
+        total_output = row["cumulative_output"]
+        total_tokens = total_input + total_output
         
         # Pour la jauge: utilise les tokens cumulés estimés pour cohérence avec compaction
-        cumulative_totals = get_session_cumulative_tokens(session_id)
-        stats["current_input_tokens"] = cumulative_totals["input_tokens"] if cumulative_totals["input_tokens"] > 0 else cumulative_totals["total_tokens"]
-        stats["current_output_tokens"] = cumulative_totals["output_tokens"]
-        stats["current_total_tokens"] = cumulative_totals["total_tokens"]
+        stats["current_input_tokens"] = total_input if total_input > 0 else total_tokens
+        stats["current_output_tokens"] = total_output
+        stats["current_total_tokens"] = total_tokens
         
         # Pour les stats cumulées: utilise aussi les tokens cumulés pour cohérence
-        stats["cumulative_input_tokens"] = cumulative_totals["input_tokens"] if cumulative_totals["input_tokens"] > 0 else cumulative_totals["total_tokens"]
-        stats["cumulative_output_tokens"] = cumulative_totals["output_tokens"]
-        stats["cumulative_total_tokens"] = cumulative_totals["total_tokens"]
+        stats["cumulative_input_tokens"] = total_input if total_input > 0 else total_tokens
+        stats["cumulative_output_tokens"] = total_output
+        stats["cumulative_total_tokens"] = total_tokens
         
-        cursor.execute(
+        cursor = conn.execute(
             """SELECT * FROM metrics 
                WHERE session_id = ? 
                ORDER BY timestamp DESC LIMIT 50""",
             (session_id,)
         )
-        recent_metrics = [dict(row) for row in cursor.fetchall()]
+        recent_metrics = _fetchall_dicts(cursor)
         
         return {
             "stats": stats,
@@ -751,14 +1054,13 @@ def get_session_stats(session_id: int) -> Dict[str, Any]:
 def get_recent_metrics(session_id: int, limit: int = 50) -> List[Dict[str, Any]]:
     """Récupère les métriques récentes d'une session."""
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
+        cursor = conn.execute(
             """SELECT * FROM metrics 
                WHERE session_id = ? 
                ORDER BY timestamp DESC LIMIT ?""",
             (session_id, limit)
         )
-        return [dict(row) for row in cursor.fetchall()]
+        return _fetchall_dicts(cursor)
 
 
 # ============================================================================
@@ -767,39 +1069,108 @@ def get_recent_metrics(session_id: int, limit: int = 50) -> List[Dict[str, Any]]
 
 def is_system_message(content: str) -> bool:
     """Détecte si un message est un message système."""
+    # Deux recherches `in` (fastsearch en C) plutôt qu'une alternance regex:
+    # le moteur `re` teste l'alternance à chaque position, ~10x plus lent ici.
     return (
         "You are Kimi Code CLI" in content or 
         "interactive general AI agent" in content
     )
 
 
+# Seuils croissants et alerte correspondante (index = nombre de seuils atteints).
+# Dicts partagés entre appels: à ne pas modifier par l'appelant.
+_ALERT_THRESHOLDS = (80, 90, 95)
+_ALERTS: Tuple[Optional[Dict[str, Any]], ...] = (
+    None,
+    {"level": "caution", "color": "#eab308", "message": "⚡ Attention (80%)"},
+    {"level": "warning", "color": "#f97316", "message": "⚠️ CONTEXTE ÉLEVÉ (90%)"},
+    {"level": "critical", "color": "#ef4444", "message": "⚠️ CONTEXTE CRITIQUE (95%)"},
+)
+
+
 def check_threshold_alert(percentage: float) -> Optional[Dict[str, Any]]:
     """Vérifie si un seuil d'alerte est atteint."""
-    if percentage >= 95:
-        return {
-            "level": "critical",
-            "color": "#ef4444",
-            "message": "⚠️ CONTEXTE CRITIQUE (95%)"
-        }
-    elif percentage >= 90:
-        return {
-            "level": "warning",
-            "color": "#f97316",
-            "message": "⚠️ CONTEXTE ÉLEVÉ (90%)"
-        }
-    elif percentage >= 80:
-        return {
-            "level": "caution",
-            "color": "#eab308",
-            "message": "⚡ Attention (80%)"
-        }
-    return None
+    if percentage != percentage:  # NaN: aucun seuil atteint
+        return None
+    return _ALERTS[bisect.bisect_right(_ALERT_THRESHOLDS, percentage)]
 
 
 # ============================================================================
 # Opérations pour Compaction History (Phase 1 Context Compaction)
 # ============================================================================
 
+# Colonnes de compaction_history (ordre du schéma): liste explicite plutôt que
+# SELECT *, et noms connus d'avance pour construire les dicts
+_COMPACTION_HISTORY_COLUMNS = (
+    "id", "session_id", "timestamp", "tokens_before", "tokens_after", "tokens_saved",
+    "preserved_messages", "summarized_messages", "compaction_ratio", "trigger_reason",
+)
+_SELECT_COMPACTION_HISTORY_SQL = (
+    f"SELECT {', '.join(_COMPACTION_HISTORY_COLUMNS)} FROM compaction_history "
+    "WHERE session_id = ? ORDER BY timestamp DESC LIMIT ?"
+)
+
+
+def _fetch_compaction_history(
+    conn: sqlite3.Connection, session_id: int, limit: int
+) -> List[Dict[str, Any]]:
+    """Historique de compaction d'une session, du plus récent au plus ancien."""
+    cursor = conn.execute(_SELECT_COMPACTION_HISTORY_SQL, (session_id, limit))
+    columns = _COMPACTION_HISTORY_COLUMNS
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+if _SQLITE_HAS_GENERATED_COLUMNS:
+    # tokens_saved et compaction_ratio sont des colonnes générées
+    _INSERT_COMPACTION_HISTORY_SQL = """INSERT INTO compaction_history 
+                (session_id, tokens_before, tokens_after,
+                 preserved_messages, summarized_messages, trigger_reason)
+               VALUES (?, ?, ?, ?, ?, ?)"""
+else:
+    _INSERT_COMPACTION_HISTORY_SQL = """INSERT INTO compaction_history 
+                (session_id, tokens_before, tokens_after, tokens_saved,
+                 preserved_messages, summarized_messages, compaction_ratio, trigger_reason)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+# Compteurs de la session (cumul incrémental: pas de SUM sur l'historique à la
+# lecture). Paramètres: nombre de compactions, tokens économisés, session_id.
+_UPDATE_SESSION_COMPACTION_SQL = """UPDATE sessions 
+               SET compaction_count = COALESCE(compaction_count, 0) + ?,
+                   total_tokens_saved = COALESCE(total_tokens_saved, 0) + ?,
+                   last_compaction_at = CURRENT_TIMESTAMP
+               WHERE id = ?"""
+
+
+def _compaction_history_params(
+    session_id: int,
+    tokens_before: int,
+    tokens_after: int,
+    preserved_messages: int,
+    summarized_messages: int,
+    trigger_reason: str = "manual"
+) -> Tuple[Any, ...]:
+    """
+    Paramètres de _INSERT_COMPACTION_HISTORY_SQL.
+
+    Session, tokens avant et après en tête dans les deux variantes;
+    l'économie et le ratio ne sont calculés ici que sans colonnes générées.
+    Les compteurs sont convertis en int natifs (pas d'adaptateur sqlite3 pour
+    des scalaires numpy ou autres entiers non natifs).
+    """
+    tokens_before = int(tokens_before)
+    tokens_after = int(tokens_after)
+    preserved_messages = int(preserved_messages)
+    summarized_messages = int(summarized_messages)
+    if _SQLITE_HAS_GENERATED_COLUMNS:
+        return (session_id, tokens_before, tokens_after,
+                preserved_messages, summarized_messages, trigger_reason)
+    tokens_saved = tokens_before - tokens_after
+    compaction_ratio = (tokens_saved / tokens_before * 100) if tokens_before > 0 else 0
+    return (session_id, tokens_before, tokens_after, tokens_saved,
+            preserved_messages, summarized_messages, compaction_ratio, trigger_reason)
+
+
+@_invalidates_session_cache
 def save_compaction_history(
     session_id: int,
     tokens_before: int,
@@ -822,34 +1193,55 @@ def save_compaction_history(
     Returns:
         ID de l'entrée créée
     """
-    tokens_saved = tokens_before - tokens_after
-    compaction_ratio = (tokens_saved / tokens_before * 100) if tokens_before > 0 else 0
-    
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # Insère l'historique
-        cursor.execute(
-            """INSERT INTO compaction_history 
-                (session_id, tokens_before, tokens_after, tokens_saved,
-                 preserved_messages, summarized_messages, compaction_ratio, trigger_reason)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (session_id, tokens_before, tokens_after, tokens_saved,
-             preserved_messages, summarized_messages, compaction_ratio, trigger_reason)
-        )
-        history_id = cursor.lastrowid
-        
-        # Met à jour les compteurs de la session
-        cursor.execute(
-            """UPDATE sessions 
-               SET compaction_count = COALESCE(compaction_count, 0) + 1,
-                   last_compaction_at = CURRENT_TIMESTAMP
-               WHERE id = ?""",
-            (session_id,)
+    params = _compaction_history_params(
+        session_id, tokens_before, tokens_after,
+        preserved_messages, summarized_messages, trigger_reason
+    )
+    with get_writer_db() as conn:
+        # Insère l'historique puis met à jour les compteurs de la session
+        history_id = conn.execute(_INSERT_COMPACTION_HISTORY_SQL, params).lastrowid
+        conn.execute(_UPDATE_SESSION_COMPACTION_SQL, (1, params[1] - params[2], session_id))
+    _invalidate_compaction_stats_cache()
+    return history_id  # type: ignore
+
+
+@_invalidates_session_cache
+def save_compaction_history_bulk(entries: Iterable[Tuple[Any, ...]]) -> List[int]:
+    """
+    Sauvegarde plusieurs historiques de compaction en une seule transaction.
+
+    Pour les imports/rejeux: un executemany pour l'historique et une mise à
+    jour des compteurs par session (agrégés côté Python), un seul commit.
+
+    Args:
+        entries: Tuples dans l'ordre des paramètres de save_compaction_history
+            (session_id, tokens_before, tokens_after, preserved_messages,
+            summarized_messages[, trigger_reason])
+
+    Returns:
+        IDs des entrées créées, dans l'ordre de `entries`
+    """
+    params = [_compaction_history_params(*entry) for entry in entries]
+    if not params:
+        return []
+
+    per_session: Dict[int, List[int]] = {}
+    for row in params:
+        counters = per_session.setdefault(row[0], [0, 0])
+        counters[0] += 1
+        counters[1] += row[1] - row[2]
+
+    with get_writer_db() as conn:
+        conn.executemany(_INSERT_COMPACTION_HISTORY_SQL, params)
+        # Écrivain unique sous BEGIN IMMEDIATE: les IDs AUTOINCREMENT du lot
+        # sont consécutifs et se terminent au dernier rowid inséré
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        conn.executemany(
+            _UPDATE_SESSION_COMPACTION_SQL,
+            [(count, saved, session_id) for session_id, (count, saved) in per_session.items()]
         )
-        
-        conn.commit()
-        return history_id  # type: ignore
+    _invalidate_compaction_stats_cache()
+    return list(range(last_id - len(params) + 1, last_id + 1))
 
 
 def get_compaction_history(session_id: int, limit: int = 50) -> List[Dict[str, Any]]:
@@ -863,53 +1255,74 @@ def get_compaction_history(session_id: int, limit: int = 50) -> List[Dict[str, A
     Returns:
         Liste des entrées d'historique
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """SELECT * FROM compaction_history 
-               WHERE session_id = ? 
-               ORDER BY timestamp DESC LIMIT ?""",
-            (session_id, limit)
-        )
-        return [dict(row) for row in cursor.fetchall()]
+    with get_reader_db() as conn:
+        return _fetch_compaction_history(conn, session_id, limit)
 
 
 def get_global_compaction_stats() -> Dict[str, Any]:
     """
     Récupère les statistiques globales de compaction.
+
+    Résultat mis en cache quelques secondes (le dashboard interroge en
+    boucle) et invalidé à chaque écriture de l'historique.
     
     Returns:
-        Statistiques globales
+        Statistiques globales (objet partagé: ne pas le modifier)
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+    global _compaction_stats_cache
+    cached = _compaction_stats_cache
+    if cached is not None and time.monotonic() - cached[0] < _COMPACTION_STATS_TTL:
+        return cached[1]
+
+    generation = _compaction_stats_generation
+    with get_reader_db() as conn:
+        # Colonnes connues: accès positionnel, sans passer par cursor.description
+        row = conn.execute("""
             SELECT 
-                COUNT(*) as total_compactions,
-                SUM(tokens_saved) as total_tokens_saved,
-                AVG(compaction_ratio) as avg_compaction_ratio,
-                MAX(timestamp) as last_compaction_at
+                COUNT(*),
+                SUM(tokens_saved),
+                AVG(compaction_ratio),
+                MAX(timestamp)
             FROM compaction_history
-        """)
-        stats = dict(cursor.fetchone())
+        """).fetchone()
+        stats = {
+            "total_compactions": row[0],
+            "total_tokens_saved": row[1],
+            "avg_compaction_ratio": row[2],
+            "last_compaction_at": row[3],
+        }
         
-        cursor.execute("""
-            SELECT 
-                session_id,
-                COUNT(*) as compaction_count,
-                SUM(tokens_saved) as session_tokens_saved
-            FROM compaction_history
-            GROUP BY session_id
+        # Compteurs par session tenus à jour dans sessions: pas de GROUP BY
+        cursor = conn.execute("""
+            SELECT id, compaction_count, total_tokens_saved
+            FROM sessions
+            WHERE compaction_count > 0
+            ORDER BY id
         """)
-        sessions = [dict(row) for row in cursor.fetchall()]
-        
-        return {
-            "global": stats,
-            "sessions": sessions
-        }
+        sessions = [
+            {"session_id": r[0], "compaction_count": r[1], "session_tokens_saved": r[2]}
+            for r in cursor.fetchall()
+        ]
+
+    result = {
+        "global": stats,
+        "sessions": sessions
+    }
+    with _compaction_stats_lock:
+        if generation == _compaction_stats_generation:
+            _compaction_stats_cache = (time.monotonic(), result)
+    return result
 
 
+# Mises à jour des réglages de compaction d'une session (appelées depuis le
+# dashboard): textes SQL constants, réutilisés par le cache de statements
+_UPDATE_RESERVED_TOKENS_SQL = "UPDATE sessions SET reserved_tokens = ? WHERE id = ?"
+_UPDATE_AUTO_COMPACTION_SQL = "UPDATE sessions SET auto_compaction_enabled = ? WHERE id = ?"
+_UPDATE_AUTO_THRESHOLD_SQL = "UPDATE sessions SET auto_compaction_threshold = ? WHERE id = ?"
+_RESET_CONSECUTIVE_SQL = "UPDATE sessions SET consecutive_auto_compactions = 0 WHERE id = ?"
+
+
+@_invalidates_session_cache
 def update_session_reserved_tokens(session_id: int, reserved_tokens: int) -> bool:
     """
     Met à jour le nombre de tokens réservés pour une session.
@@ -921,18 +1334,17 @@ def update_session_reserved_tokens(session_id: int, reserved_tokens: int) -> boo
     Returns:
         True si mis à jour avec succès
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "UPDATE sessions SET reserved_tokens = ? WHERE id = ?",
-                (reserved_tokens, session_id)
+    # BEGIN IMMEDIATE et COMMIT peuvent échouer (base verrouillée): dans le try
+    try:
+        with get_writer_db() as conn:
+            cursor = conn.execute(
+                _UPDATE_RESERVED_TOKENS_SQL,
+                (int(reserved_tokens), session_id)
             )
-            conn.commit()
             return cursor.rowcount > 0
-        except Exception as e:
-            print(f"⚠️ Erreur mise à jour tokens réservés: {e}")
-            return False
+    except Exception as e:
+        logger.warning("Erreur mise à jour tokens réservés: %s", e)
+        return False
 
 
 def get_session_compaction_state(session_id: int) -> Dict[str, Any]:
@@ -945,13 +1357,12 @@ def get_session_compaction_state(session_id: int) -> Dict[str, Any]:
     Returns:
         État de compaction incluant compteurs et historique
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # Récupère les infos de la session
-        cursor.execute(
+    with get_reader_db() as conn:
+        # Infos de la session, total économisé compris (cumul tenu à jour)
+        cursor = conn.execute(
             """SELECT reserved_tokens, compaction_count, last_compaction_at,
-                      auto_compaction_enabled, auto_compaction_threshold, consecutive_auto_compactions
+                      auto_compaction_enabled, auto_compaction_threshold, consecutive_auto_compactions,
+                      total_tokens_saved
                FROM sessions WHERE id = ?""",
             (session_id,)
         )
@@ -970,16 +1381,8 @@ def get_session_compaction_state(session_id: int) -> Dict[str, Any]:
                 "total_tokens_saved": 0
             }
         
-        # Récupère l'historique
-        history = get_compaction_history(session_id, limit=10)
-        
-        # Calcule le total économisé
-        cursor.execute(
-            """SELECT COALESCE(SUM(tokens_saved), 0) as total_saved
-               FROM compaction_history WHERE session_id = ?""",
-            (session_id,)
-        )
-        total_saved = cursor.fetchone()[0] or 0
+        # Historique récent, sur la même connexion
+        history = _fetch_compaction_history(conn, session_id, 10)
         
         return {
             "session_id": session_id,
@@ -990,10 +1393,11 @@ def get_session_compaction_state(session_id: int) -> Dict[str, Any]:
             "auto_compaction_threshold": row[4] if row[4] is not None else 0.85,
             "consecutive_auto_compactions": row[5] or 0,
             "history": history,
-            "total_tokens_saved": total_saved
+            "total_tokens_saved": row[6] or 0
         }
 
 
+@_invalidates_session_cache
 def update_session_auto_compaction(session_id: int, enabled: bool) -> bool:
     """
     Active ou désactive l'auto-compaction pour une session.
@@ -1005,20 +1409,19 @@ def update_session_auto_compaction(session_id: int, enabled: bool) -> bool:
     Returns:
         True si mis à jour avec succès
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "UPDATE sessions SET auto_compaction_enabled = ? WHERE id = ?",
-                (enabled, session_id)
+    try:
+        with get_writer_db() as conn:
+            cursor = conn.execute(
+                _UPDATE_AUTO_COMPACTION_SQL,
+                (bool(enabled), session_id)
             )
-            conn.commit()
             return cursor.rowcount > 0
-        except Exception as e:
-            print(f"⚠️ Erreur mise à jour auto-compaction: {e}")
-            return False
+    except Exception as e:
+        logger.warning("Erreur mise à jour auto-compaction: %s", e)
+        return False
 
 
+@_invalidates_session_cache
 def update_session_auto_threshold(session_id: int, threshold: float) -> bool:
     """
     Met à jour le seuil d'auto-compaction pour une session.
@@ -1030,20 +1433,24 @@ def update_session_auto_threshold(session_id: int, threshold: float) -> bool:
     Returns:
         True si mis à jour avec succès
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "UPDATE sessions SET auto_compaction_threshold = ? WHERE id = ?",
-                (threshold, session_id)
+    try:
+        with get_writer_db() as conn:
+            cursor = conn.execute(
+                _UPDATE_AUTO_THRESHOLD_SQL,
+                (float(threshold), session_id)
             )
-            conn.commit()
             return cursor.rowcount > 0
-        except Exception as e:
-            print(f"⚠️ Erreur mise à jour seuil auto-compaction: {e}")
-            return False
+    except Exception as e:
+        logger.warning("Erreur mise à jour seuil auto-compaction: %s", e)
+        return False
+
+
+_INCREMENT_CONSECUTIVE_SQL = """UPDATE sessions 
+               SET consecutive_auto_compactions = COALESCE(consecutive_auto_compactions, 0) + 1
+               WHERE id = ?"""
 
 
+@_invalidates_session_cache
 def increment_consecutive_auto_compactions(session_id: int) -> int:
     """
     Incrémente le compteur de compactions automatiques consécutives.
@@ -1054,23 +1461,24 @@ def increment_consecutive_auto_compactions(session_id: int) -> int:
     Returns:
         Nouvelle valeur du compteur
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """UPDATE sessions 
-               SET consecutive_auto_compactions = COALESCE(consecutive_auto_compactions, 0) + 1
-               WHERE id = ?""",
-            (session_id,)
-        )
-        conn.commit()
-        
-        cursor.execute(
+    with get_writer_db() as conn:
+        if _SQLITE_HAS_RETURNING:
+            # Nouvelle valeur lue dans le même statement (curseur épuisé avant commit)
+            rows = conn.execute(
+                _INCREMENT_CONSECUTIVE_SQL + " RETURNING consecutive_auto_compactions",
+                (session_id,)
+            ).fetchall()
+            return rows[0][0] or 0
+
+        conn.execute(_INCREMENT_CONSECUTIVE_SQL, (session_id,))
+        cursor = conn.execute(
             "SELECT consecutive_auto_compactions FROM sessions WHERE id = ?",
             (session_id,)
         )
         return cursor.fetchone()[0] or 0
 
 
+@_invalidates_session_cache
 def reset_consecutive_auto_compactions(session_id: int) -> bool:
     """
     Réinitialise le compteur de compactions automatiques consécutives.
@@ -1081,19 +1489,19 @@ def reset_consecutive_auto_compactions(session_id: int) -> bool:
     Returns:
         True si mis à jour avec succès
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "UPDATE sessions SET consecutive_auto_compactions = 0 WHERE id = ?",
+    try:
+        with get_writer_db() as conn:
+            cursor = conn.execute(
+                _RESET_CONSECUTIVE_SQL,
                 (session_id,)
             )
-            conn.commit()
             return cursor.rowcount > 0
-        except Exception as e:
-            print(f"⚠️ Erreur réinitialisation compteur: {e}")
-            return False
+    except Exception as e:
+        logger.warning("Erreur réinitialisation compteur: %s", e)
+        return False
+
 
+@_invalidates_session_cache
 def delete_session(session_id: int) -> bool:
     """
     Supprime une session et toutes ses données associées.
@@ -1104,32 +1512,31 @@ def delete_session(session_id: int) -> bool:
     Returns:
         True si supprimée avec succès
     """
-    _invalidate_session_cache()
     with get_db() as conn:
-        cursor = conn.cursor()
         try:
             # Supprime les métriques associées
-            cursor.execute("DELETE FROM metrics WHERE session_id = ?", (session_id,))
-            cursor.execute("DELETE FROM memory_metrics WHERE session_id = ?", (session_id,))
-            cursor.execute("DELETE FROM memory_segments WHERE session_id = ?", (session_id,))
-            cursor.execute("DELETE FROM compression_log WHERE session_id = ?", (session_id,))
-            cursor.execute("DELETE FROM compaction_history WHERE session_id = ?", (session_id,))
-            cursor.execute("DELETE FROM mcp_memory_entries WHERE session_id = ?", (session_id,))
-            cursor.execute("DELETE FROM mcp_compression_results WHERE session_id = ?", (session_id,))
-            cursor.execute("DELETE FROM mcp_routing_decisions WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM metrics WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM memory_metrics WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM memory_segments WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM compression_log WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM compaction_history WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM mcp_memory_entries WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM mcp_compression_results WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM mcp_routing_decisions WHERE session_id = ?", (session_id,))
             
             # Supprime la session
-            cursor.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            cursor = conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
             
             deleted = cursor.rowcount > 0
             if deleted:
                 conn.commit()
+                _invalidate_compaction_stats_cache()
                 print(f"✅ Session {session_id} supprimée avec toutes ses données")
             
             return deleted
         except Exception as e:
             conn.rollback()
-            print(f"❌ Erreur suppression session {session_id}: {e}")
+            logger.error("Erreur suppression session %s: %s", session_id, e)
             return False
 
 def delete_sessions_bulk(session_ids: List[int]) -> Dict[str, Any]:
@@ -1193,9 +1600,8 @@ def vacuum_database() -> Dict[str, Any]:
         
         # Exécute VACUUM
         conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
         
-        cursor.execute("VACUUM")
+        conn.execute("VACUUM")
         conn.commit()
         conn.close()
         
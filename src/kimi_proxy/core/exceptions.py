@@ -12,10 +12,13 @@ class KimiProxyError(Exception):
         self.message = message
         self.code = code or "unknown_error"
         self.details = details or {}
+        # repr des détails figé à la construction: __str__ est appelé en boucle
+        # sur les chemins de retry (logs StreamingError, RateLimitError)
+        self._details_repr = repr(self.details) if self.details else ""
 
     def __str__(self):
-        if self.details:
-            return f"[{self.code}] {self.message} - Détails: {self.details}"
+        if self._details_repr:
+            return f"[{self.code}] {self.message} - Détails: {self._details_repr}"
         return f"[{self.code}] {self.message}"
 
 
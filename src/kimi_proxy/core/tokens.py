@@ -1,8 +1,13 @@
 """
 Tokenization avec Tiktoken - Comptage précis des tokens.
 """
-import json
-from typing import List, Union
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from json.encoder import encode_basestring
+from typing import Any, Hashable, List, Tuple, Union
 
 import tiktoken
 
@@ -11,11 +16,104 @@ from .exceptions import TokenizationError
 # Encodage Tiktoken (cl100k_base = même encodage que GPT-4, Kimi, etc.)
 ENCODING = tiktoken.get_encoding("cl100k_base")
 
+# Longueur en tokens des rôles usuels, calculée une fois à l'import
+_ROLE_TOKENS = {
+    role: len(ENCODING.encode(role))
+    for role in ("system", "user", "assistant", "tool", "function")
+}
+
+
+# encode_batch répartit les textes sur un ThreadPoolExecutor créé à chaque
+# appel: rentable seulement pour de gros lots et sur plusieurs cœurs
+_BATCH_MIN_TEXTS = 64
+_BATCH_THREADS = min(8, os.cpu_count() or 1)
+
+
+@functools.lru_cache(maxsize=64)
+def _role_token_count(role: str) -> int:
+    """Longueur en tokens d'un rôle hors _ROLE_TOKENS (mise en cache)."""
+    return len(ENCODING.encode(role))
+
+
+class _PrefixTokenCache:
+    """
+    Cumuls de tokens par préfixe de conversation (LRU borné).
+
+    La clé d'un préfixe est un hash chaîné des (rôle, contenu) de ses
+    messages: un historique qui ne fait que s'allonger d'une requête à
+    l'autre ne réencode que ses nouveaux messages.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._totals: "OrderedDict[int, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def longest_prefix(self, prefix_hashes: List[int]) -> Tuple[int, int]:
+        """(messages couverts, cumul de tokens) du plus long préfixe connu."""
+        with self._lock:
+            for index in range(len(prefix_hashes) - 1, -1, -1):
+                total = self._totals.get(prefix_hashes[index])
+                if total is not None:
+                    self._totals.move_to_end(prefix_hashes[index])
+                    return index + 1, total
+        return 0, 0
+
+    def store(self, prefix_hash: int, total: int) -> None:
+        """Enregistre le cumul de tokens d'un préfixe."""
+        with self._lock:
+            self._totals[prefix_hash] = total
+            self._totals.move_to_end(prefix_hash)
+            if len(self._totals) > self.max_entries:
+                self._totals.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vide le cache."""
+        with self._lock:
+            self._totals.clear()
+
+
+_PREFIX_TOKEN_CACHE = _PrefixTokenCache(max_entries=1024)
+
+
+def _content_key(content: Any) -> Hashable:
+    """Clé hashable des parties d'un contenu qui comptent dans le total."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        key = []
+        for part in content:
+            if isinstance(part, dict):
+                part_type = part.get("type")
+                if part_type == "text":
+                    key.append(part.get("text", ""))
+                elif part_type == "image_url":
+                    key.append(None)
+        return tuple(key)
+    return None
+
+
+def _prefix_hashes(messages: List[dict]) -> List[int]:
+    """Hash chaîné de chaque préfixe de `messages` (rôle et contenu)."""
+    hashes = []
+    prefix_hash = 0
+    for message in messages:
+        prefix_hash = hash((
+            prefix_hash,
+            message.get("role", ""),
+            _content_key(message.get("content", "")),
+        ))
+        hashes.append(prefix_hash)
+    return hashes
+
 
 def count_tokens_tiktoken(messages: List[dict]) -> int:
     """
     Compte précisément les tokens d'une liste de messages.
     Format compatible OpenAI/Kimi.
+
+    Seuls les messages qui suivent le plus long préfixe déjà compté sont
+    encodés (voir _PrefixTokenCache).
     
     Args:
         messages: Liste de messages au format OpenAI
@@ -30,28 +128,45 @@ def count_tokens_tiktoken(messages: List[dict]) -> int:
         return 0
     
     try:
-        token_count = 0
+        prefix_hashes = _prefix_hashes(messages)
+        start, token_count = _PREFIX_TOKEN_CACHE.longest_prefix(prefix_hashes)
+        # Textes à encoder, collectés pour un encodage groupé en fin de boucle
+        texts = []
+        add_text = texts.append
         
-        for message in messages:
+        for message in messages[start:]:
             token_count += 3  # Tokens de début/role/fin
             role = message.get("role", "")
             content = message.get("content", "")
             
-            token_count += len(ENCODING.encode(role))
+            role_tokens = _ROLE_TOKENS.get(role)
+            if role_tokens is None:
+                role_tokens = _role_token_count(role)
+            token_count += role_tokens
             
             if isinstance(content, str):
-                token_count += len(ENCODING.encode(content))
+                add_text(content)
             elif isinstance(content, list):
                 # Format multimodal (images, etc.)
                 for part in content:
                     if isinstance(part, dict):
-                        if part.get("type") == "text":
-                            text = part.get("text", "")
-                            token_count += len(ENCODING.encode(text))
-                        elif part.get("type") == "image_url":
-                            # Estimation: ~512 tokens par image
+                        part_type = part.get("type")
+                        if part_type == "text":
+                            add_text(part.get("text", ""))
+                        elif part_type == "image_url":
+                            # Estimation constante, sans encodage: ~512 tokens par image
                             token_count += 512
         
+        if _BATCH_THREADS > 1 and len(texts) >= _BATCH_MIN_TEXTS:
+            encoded = ENCODING.encode_batch(texts, num_threads=_BATCH_THREADS)
+            token_count += sum(map(len, encoded))
+        else:
+            encode = ENCODING.encode
+            for text in texts:
+                token_count += len(encode(text))
+        if start < len(messages):
+            _PREFIX_TOKEN_CACHE.store(prefix_hashes[-1], token_count)
+        
         token_count += 3  # Tokens de fin
         return token_count
     except Exception as e:
@@ -61,9 +176,45 @@ def count_tokens_tiktoken(messages: List[dict]) -> int:
         )
 
 
+# Cache des comptages de count_tokens_text: prompts système et schémas
+# d'outils reviennent à chaque requête. Les textes courts servent directement
+# de clé; au-delà de _LARGE_TEXT_CHARS la clé est un condensé blake2b, pour ne
+# pas garder de gros textes en vie dans le cache.
+_TEXT_CACHE_MAX_ENTRIES = 4096
+_LARGE_TEXT_CHARS = 8192
+_LARGE_TEXT_CACHE_MAX_ENTRIES = 256
+_large_text_tokens: "OrderedDict[bytes, int]" = OrderedDict()
+_large_text_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=_TEXT_CACHE_MAX_ENTRIES)
+def _count_tokens_text_cached(text: str) -> int:
+    """Nombre de tokens d'un texte court (mis en cache)."""
+    return len(ENCODING.encode(text))
+
+
+def _count_tokens_large_text(text: str) -> int:
+    """Nombre de tokens d'un long texte, mis en cache sous son condensé (LRU)."""
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _large_text_lock:
+        count = _large_text_tokens.get(key)
+        if count is not None:
+            _large_text_tokens.move_to_end(key)
+            return count
+
+    count = len(ENCODING.encode(text))
+    with _large_text_lock:
+        _large_text_tokens[key] = count
+        if len(_large_text_tokens) > _LARGE_TEXT_CACHE_MAX_ENTRIES:
+            _large_text_tokens.popitem(last=False)
+    return count
+
+
 def count_tokens_text(text: str) -> int:
     """
     Compte les tokens d'un texte simple.
+
+    Les comptages sont mis en cache: un texte déjà vu n'est pas réencodé.
     
     Args:
         text: Texte à analyser
@@ -73,7 +224,9 @@ def count_tokens_text(text: str) -> int:
     """
     if not text:
         return 0
-    return len(ENCODING.encode(text))
+    if len(text) > _LARGE_TEXT_CHARS:
+        return _count_tokens_large_text(text)
+    return _count_tokens_text_cached(text)
 
 
 def count_tokens_from_string(content: str) -> int:
@@ -83,18 +236,85 @@ def count_tokens_from_string(content: str) -> int:
     return count_tokens_text(content)
 
 
+# Surcoûts structurels JSON, en tokens. cl100k fusionne les guillemets avec la
+# ponctuation voisine ('{"', '":', '","' valent un token): une chaîne coûte son
+# texte plus un token, le ':' d'une paire est absorbé par le guillemet fermant
+# de la clé, un conteneur coûte son ouverture et sa fermeture, et chaque ','
+# entre deux éléments un token.
+_JSON_STRING_OVERHEAD = len(ENCODING.encode('":'))
+_JSON_CONTAINER_OVERHEAD = len(ENCODING.encode("{")) + len(ENCODING.encode("}"))
+_JSON_COMMA_TOKENS = len(ENCODING.encode(","))
+
+
+_INFINITY = float("inf")
+
+
+def _json_scalar_literal(node: Any) -> str:
+    """Littéral JSON d'un scalaire non chaîne (comme json.dumps)."""
+    if node is None:
+        return "null"
+    if node is True:
+        return "true"
+    if node is False:
+        return "false"
+    if isinstance(node, int):
+        return int.__repr__(node)
+    if isinstance(node, float):
+        if node != node:
+            return "NaN"
+        if node in (_INFINITY, -_INFINITY):
+            return "Infinity" if node > 0 else "-Infinity"
+        return float.__repr__(node)
+    raise TypeError(f"Type non sérialisable en JSON: {type(node).__name__}")
+
+
+def _json_string_tokens(text: str) -> int:
+    """
+    Tokens d'une chaîne JSON: texte échappé comme par json.dumps (\\n, \\",
+    \\\\, \\uXXXX), chaîne par chaîne via l'échappeur C, plus les guillemets.
+    """
+    return count_tokens_text(encode_basestring(text)[1:-1]) + _JSON_STRING_OVERHEAD
+
+
+def _json_tokens(node: Any) -> int:
+    """Tokens estimés de la représentation JSON de `node`, sans la construire."""
+    if isinstance(node, str):
+        return _json_string_tokens(node)
+    if isinstance(node, dict):
+        tokens = _JSON_CONTAINER_OVERHEAD
+        if node:
+            tokens += _JSON_COMMA_TOKENS * (len(node) - 1)
+        for key, value in node.items():
+            if not isinstance(key, str):
+                key = _json_scalar_literal(key)
+            tokens += _json_string_tokens(key) + _json_tokens(value)
+        return tokens
+    if isinstance(node, (list, tuple)):
+        tokens = _JSON_CONTAINER_OVERHEAD
+        if node:
+            tokens += _JSON_COMMA_TOKENS * (len(node) - 1)
+        for item in node:
+            tokens += _json_tokens(item)
+        return tokens
+    return count_tokens_text(_json_scalar_literal(node))
+
+
 def estimate_tokens_json(data: Union[dict, list]) -> int:
     """
     Estime les tokens d'une structure JSON.
+
+    La structure est parcourue directement (chaînes échappées une à une et
+    littéraux comptés via le cache de count_tokens_text, ponctuation JSON
+    ajoutée en surcoût fixe): la chaîne JSON complète n'est jamais construite. L'estimation reste proche
+    du comptage exact de json.dumps, sans lui être identique.
     
     Args:
         data: Données JSON (dict ou list)
         
     Returns:
-        Nombre de tokens estimé
+        Nombre de tokens estimé (0 si la structure n'est pas sérialisable)
     """
     try:
-        json_str = json.dumps(data, ensure_ascii=False)
-        return count_tokens_text(json_str)
-    except (TypeError, ValueError):
+        return _json_tokens(data)
+    except (TypeError, ValueError, RecursionError):
         return 0
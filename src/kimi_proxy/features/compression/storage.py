@@ -38,8 +38,7 @@ async def compress_session_history(
     
     # Récupère les métriques de la session pour reconstruire l'historique
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+        cursor = conn.execute("""
             SELECT content_preview, prompt_tokens, completion_tokens, timestamp
             FROM metrics 
             WHERE session_id = ? 
@@ -116,9 +115,8 @@ async def compress_session_history(
         summary_preview = final_messages[metadata.get("system_count", 0)].get("content", "")[:200]
     
     with get_db() as conn:
-        cursor = conn.cursor()
         try:
-            cursor.execute("""
+            cursor = conn.execute("""
                 INSERT INTO compression_log 
                 (session_id, timestamp, original_tokens, compressed_tokens, compression_ratio, summary_preview)
                 VALUES (?, ?, ?, ?, ?, ?)
@@ -160,10 +158,8 @@ def get_compression_stats(session_id: Optional[int] = None) -> Dict[str, Any]:
         Statistiques de compression
     """
     with get_db() as conn:
-        cursor = conn.cursor()
-        
         if session_id:
-            cursor.execute("""
+            cursor = conn.execute("""
                 SELECT COUNT(*), SUM(original_tokens), SUM(compressed_tokens), AVG(compression_ratio)
                 FROM compression_log 
                 WHERE session_id = ?
@@ -176,7 +172,7 @@ def get_compression_stats(session_id: Optional[int] = None) -> Dict[str, Any]:
                 "avg_compression_ratio": round(row[3] or 0, 2)
             }
         else:
-            cursor.execute("""
+            cursor = conn.execute("""
                 SELECT COUNT(*), SUM(original_tokens), SUM(compressed_tokens), AVG(compression_ratio)
                 FROM compression_log
             """)
@@ -201,8 +197,7 @@ def get_session_compression_logs(session_id: int, limit: int = 10) -> List[Dict[
         Liste des logs
     """
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+        cursor = conn.execute("""
             SELECT id, timestamp, original_tokens, compressed_tokens, 
                    compression_ratio, summary_preview
             FROM compression_log
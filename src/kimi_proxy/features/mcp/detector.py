@@ -3,9 +3,26 @@ import re
 from typing import List, Dict, Any, Tuple
 from dataclasses import dataclass
 
-from ...core.constants import MCP_PATTERNS, MCP_MIN_MEMORY_TOKENS
+from ...core.constants import MCP_PATTERNS, MCP_PATTERNS_COMPILED, MCP_MIN_MEMORY_TOKENS
 from ...core.tokens import count_tokens_text
 
+# Outils MCP Phase 4: (nom du pattern, type de serveur)
+_PHASE4_PATTERNS = (
+    ('mcp_shrimp_task_manager', 'shrimp_task_manager'),
+    ('mcp_sequential_thinking', 'sequential_thinking'),
+    ('mcp_fast_filesystem', 'fast_filesystem'),
+    ('mcp_json_query', 'json_query'),
+)
+
+# Préfiltre: tous les noms d'outils Phase 4 en une seule alternance, pour
+# écarter en un seul passage les contenus sans aucun outil (cas courant).
+# Les scans par serveur restent nécessaires ensuite: des noms de serveurs
+# différents peuvent se chevaucher dans le texte.
+_PHASE4_ANY_TOOL = re.compile(
+    "|".join(MCP_PATTERNS[pattern_name] for pattern_name, _ in _PHASE4_PATTERNS),
+    re.IGNORECASE,
+)
+
 @dataclass
 class MemorySegment:
     """Segment de mémoire détecté."""
@@ -27,19 +44,8 @@ class MCPDetector:
     
     def __init__(self, min_tokens: int = MCP_MIN_MEMORY_TOKENS):
         self.min_tokens = min_tokens
-        self.patterns = {
-            'memory_tag': re.compile(MCP_PATTERNS['memory_tag'], re.DOTALL | re.IGNORECASE),
-            'memory_ref': re.compile(MCP_PATTERNS['memory_ref'], re.IGNORECASE),
-            'memory_block': re.compile(MCP_PATTERNS['memory_block'], re.DOTALL | re.IGNORECASE),
-            'mcp_result': re.compile(MCP_PATTERNS['mcp_result'], re.DOTALL | re.IGNORECASE),
-            'mcp_tool': re.compile(MCP_PATTERNS['mcp_tool'], re.DOTALL | re.IGNORECASE),
-            'context_memory': re.compile(MCP_PATTERNS['context_memory'], re.IGNORECASE),
-            # Phase 4 - Nouveaux serveurs MCP
-            'mcp_shrimp_task_manager': re.compile(MCP_PATTERNS['mcp_shrimp_task_manager'], re.IGNORECASE),
-            'mcp_sequential_thinking': re.compile(MCP_PATTERNS['mcp_sequential_thinking'], re.IGNORECASE),
-            'mcp_fast_filesystem': re.compile(MCP_PATTERNS['mcp_fast_filesystem'], re.IGNORECASE),
-            'mcp_json_query': re.compile(MCP_PATTERNS['mcp_json_query'], re.IGNORECASE),
-        }
+        # Patterns précompilés à l'import de `core.constants` (pas de re.compile par instance)
+        self.patterns = MCP_PATTERNS_COMPILED
     
     def detect(self, content: str) -> List[MemorySegment]:
         """
@@ -99,15 +105,11 @@ class MCPDetector:
         
         if not content or not isinstance(content, str):
             return segments
+
+        if _PHASE4_ANY_TOOL.search(content) is None:
+            return segments
         
-        phase4_patterns = [
-            ('mcp_shrimp_task_manager', 'shrimp_task_manager'),
-            ('mcp_sequential_thinking', 'sequential_thinking'),
-            ('mcp_fast_filesystem', 'fast_filesystem'),
-            ('mcp_json_query', 'json_query'),
-        ]
-        
-        for pattern_name, server_type in phase4_patterns:
+        for pattern_name, server_type in _PHASE4_PATTERNS:
             pattern = self.patterns.get(pattern_name)
             if pattern:
                 matches = pattern.finditer(content)
@@ -4,7 +4,7 @@ Routing dynamique - Context Window Fallback (Phase 1).
 from typing import Optional, Tuple, Dict, Any
 
 from ...core.constants import DEFAULT_MAX_CONTEXT, CONTEXT_FALLBACK_THRESHOLD, DEFAULT_PROVIDER
-from ...core.database import get_db
+from ...core.database import get_session_cumulative_tokens, update_session_model
 
 
 def find_heavy_duty_model(
@@ -98,16 +98,7 @@ async def route_dynamic_model(
     new_max_context = models.get(fallback_model, {}).get("max_context_size", DEFAULT_MAX_CONTEXT)
     
     # Met à jour en DB
-    with get_db() as conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "UPDATE sessions SET model = ? WHERE id = ?",
-                (fallback_model, session["id"])
-            )
-            conn.commit()
-        except Exception as e:
-            print(f"⚠️ Erreur mise à jour modèle session: {e}")
+    update_session_model(session["id"], fallback_model)
     
     print(f"🔄 [ROUTING] Fallback: {old_model} → {fallback_model} "
           f"({max_context/1024:.0f}K → {new_max_context/1024:.0f}K contexte)")
@@ -144,40 +135,6 @@ def get_session_total_tokens(session_id: int) -> Dict[str, int]:
     - Output: Somme des completion_tokens (réels)
     - Total: Input + Output
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                estimated_tokens,
-                prompt_tokens,
-                completion_tokens,
-                is_estimated
-            FROM metrics 
-            WHERE session_id = ? 
-            ORDER BY timestamp ASC
-        """, (session_id,))
-        
-        rows = cursor.fetchall()
-    
-    total_input = 0
-    total_output = 0
-    
-    for row in rows:
-        estimated = row[0] or 0
-        prompt = row[1] or 0
-        completion = row[2] or 0
-        
-        # Pour l'input: utilise prompt_tokens si disponible, sinon estimated_tokens
-        if prompt > 0:
-            total_input += prompt
-        else:
-            total_input += estimated
-        
-        # Pour l'output: toujours completion_tokens
-        total_output += completion
-    
-    return {
-        "input_tokens": total_input,
-        "output_tokens": total_output,
-        "total_tokens": total_input + total_output
-    }
+    # Sommes calculées par SQLite: l'historique des métriques n'est jamais
+    # chargé en mémoire côté Python
+    return get_session_cumulative_tokens(session_id)
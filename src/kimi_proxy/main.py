@@ -13,7 +13,7 @@ from fastapi import FastAPI, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from .core.database import init_database, create_session, get_active_session
+from .core.database import init_database, create_session, get_active_session, close_db_pools
 from .config.loader import load_config, get_log_watcher_config
 
 from .features.log_watcher import create_log_watcher
@@ -360,6 +360,9 @@ async def _shutdown(app: FastAPI):
     if hasattr(app.state, 'log_watcher'):
         await app.state.log_watcher.stop()
     
+    # Ferme les connexions SQLite poolées (avec PRAGMA optimize)
+    close_db_pools()
+    
     print("✅ Serveur arrêté proprement")
 
 
@@ -1,7 +1,8 @@
 """
 Gestion des alertes et seuils.
 """
-from typing import Optional, Dict, Any
+import bisect
+from typing import Optional, Dict, Any, Tuple
 
 from ..core.constants import ALERT_THRESHOLDS
 
@@ -80,6 +81,17 @@ class AlertManager:
         self.last_alert_level = None
 
 
+# Seuils croissants et alerte correspondante (index = nombre de seuils atteints).
+# Dicts construits une fois et partagés: à ne pas modifier par l'appelant.
+_THRESHOLDS = (80, 90, 95)
+_THRESHOLD_ALERTS: Tuple[Optional[Dict[str, Any]], ...] = (
+    None,
+    {"level": "caution", "color": "#eab308", "message": "⚡ Attention (80%)"},
+    {"level": "warning", "color": "#f97316", "message": "⚠️ CONTEXTE ÉLEVÉ (90%)"},
+    {"level": "critical", "color": "#ef4444", "message": "⚠️ CONTEXTE CRITIQUE (95%)"},
+)
+
+
 def check_threshold_alert(percentage: float) -> Optional[Dict[str, Any]]:
     """
     Fonction utilitaire pour vérifier les seuils.
@@ -88,27 +100,11 @@ def check_threshold_alert(percentage: float) -> Optional[Dict[str, Any]]:
         percentage: Pourcentage du contexte utilisé
         
     Returns:
-        Dictionnaire d'alerte ou None
+        Dictionnaire d'alerte (partagé) ou None
     """
-    if percentage >= 95:
-        return {
-            "level": "critical",
-            "color": "#ef4444",
-            "message": "⚠️ CONTEXTE CRITIQUE (95%)"
-        }
-    elif percentage >= 90:
-        return {
-            "level": "warning",
-            "color": "#f97316",
-            "message": "⚠️ CONTEXTE ÉLEVÉ (90%)"
-        }
-    elif percentage >= 80:
-        return {
-            "level": "caution",
-            "color": "#eab308",
-            "message": "⚡ Attention (80%)"
-        }
-    return None
+    if percentage != percentage:  # NaN: aucun seuil atteint
+        return None
+    return _THRESHOLD_ALERTS[bisect.bisect_right(_THRESHOLDS, percentage)]
 
 
 def format_alert_message(level: str, percentage: float) -> str:
@@ -12,8 +12,8 @@ import pytest
 
 from fastapi.testclient import TestClient
 
-from src.kimi_proxy.main import create_app
-from src.kimi_proxy.core.database import init_database, get_db, create_session
+from kimi_proxy.main import create_app
+from kimi_proxy.core.database import init_database, get_db, create_session
 
 
 @pytest.fixture(scope="module")
@@ -6,11 +6,16 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import pytest
+from kimi_proxy.core import auto_session
 from kimi_proxy.core.auto_session import (
+    detect_provider_from_model,
     extract_external_session_id_from_request,
     extract_provider_from_request,
+    get_auto_session_status,
+    set_auto_session_status,
     should_auto_create_session,
 )
+from kimi_proxy.config.loader import _clear_config_cache
 
 
 def test_should_auto_create_session_no_current_session():
@@ -192,5 +197,80 @@ def test_nvidia_models_distinction():
                 assert result is True, f"Les modèles {model1} et {model2} devraient créer des sessions différentes"
 
 
+MODELS_CONFIG = {
+    "kimi-code/kimi-for-coding": {"provider": "managed:kimi-code", "model": "kimi-for-coding"},
+    "nvidia/kimi-k2.5": {"provider": "nvidia", "model": "moonshotai/kimi-k2.5"},
+}
+
+
+def test_detect_provider_from_model_exact_suffix_and_internal():
+    """Test: clé exacte, suffixe de clé puis nom de modèle interne."""
+    assert detect_provider_from_model("nvidia/kimi-k2.5", MODELS_CONFIG) == "nvidia"
+    assert detect_provider_from_model("kimi-for-coding", MODELS_CONFIG) == "managed:kimi-code"
+    assert detect_provider_from_model("moonshotai/kimi-k2.5", MODELS_CONFIG) == "nvidia"
+    assert detect_provider_from_model("unknown-model", MODELS_CONFIG) is None
+
+
+def test_detect_provider_from_model_matches_basename_and_nested_suffixes():
+    """Test: suffixes après n'importe quel '/' (basename compris), première clé gagnante."""
+    models_config = {
+        "org/team/glm-5": {"provider": "first", "model": "z-ai/glm5"},
+        "other/glm-5": {"provider": "second"},
+        "disabled/none": {"provider": None},
+    }
+    assert detect_provider_from_model("glm-5", models_config) == "first"
+    assert detect_provider_from_model("team/glm-5", models_config) == "first"
+    assert detect_provider_from_model("glm5", models_config) == "first"
+    # Un provider vide sur la clé exacte n'est pas remplacé par un suffixe
+    assert detect_provider_from_model("disabled/none", models_config) is None
+
+
+def test_detect_provider_from_model_cache_follows_models_config():
+    """Test: le cache est propre au dict models_config et vidé au rechargement."""
+    models_config = {"a/m": {"provider": "a"}}
+    assert detect_provider_from_model("m", models_config) == "a"
+
+    # Un autre dict (config rechargée) ne réutilise pas le cache précédent
+    assert detect_provider_from_model("m", {"b/m": {"provider": "b"}}) == "b"
+
+    models_config["a/m"]["provider"] = "c"
+    _clear_config_cache()
+    assert detect_provider_from_model("m", models_config) == "c"
+
+
+def test_process_auto_session_exact_model_key_keeps_matching_session():
+    """Test: clé de modèle exacte résolue sans créer de nouvelle session."""
+    from kimi_proxy.config.settings import Settings
+
+    settings = Settings.from_config({"models": MODELS_CONFIG})
+    current_session = {"id": 1, "provider": "nvidia", "model": "moonshotai/kimi-k2.5"}
+
+    session, created = auto_session.process_auto_session(
+        {"model": "nvidia/kimi-k2.5"}, current_session, settings=settings
+    )
+
+    assert session is current_session
+    assert created is False
+
+
+def test_auto_session_status_defaults_to_enabled_and_is_bounded(monkeypatch):
+    """Test: statut activé par défaut, cache borné avec éviction LRU."""
+    monkeypatch.setattr(auto_session, "_AUTO_SESSION_CACHE_MAX_ENTRIES", 2)
+    auto_session._auto_session_disabled.clear()
+
+    assert get_auto_session_status(101) is True
+    set_auto_session_status(101, False)
+    set_auto_session_status(102, False)
+    assert get_auto_session_status(101) is False  # 101 redevient le plus récent
+    set_auto_session_status(103, False)
+
+    assert get_auto_session_status(102) is True  # évincé, retour au défaut
+    assert get_auto_session_status(101) is False
+    assert len(auto_session._auto_session_disabled) == 2
+    set_auto_session_status(101, True)
+    assert 101 not in auto_session._auto_session_disabled
+    auto_session._auto_session_disabled.clear()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
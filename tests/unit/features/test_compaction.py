@@ -4,14 +4,14 @@ Tests unitaires pour le service SimpleCompaction.
 import pytest
 from typing import List, Dict, Any
 
-from src.kimi_proxy.features.compaction.simple_compaction import (
+from kimi_proxy.features.compaction.simple_compaction import (
     SimpleCompaction,
     CompactionResult,
     CompactionConfig,
     get_compactor,
     create_compactor,
 )
-from src.kimi_proxy.core.tokens import count_tokens_tiktoken
+from kimi_proxy.core.tokens import count_tokens_tiktoken
 
 
 class TestCompactionConfig:
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+import pytest
+
+from kimi_proxy.services.alerts import check_threshold_alert
+
+
+@pytest.mark.parametrize(
+    ("percentage", "level"),
+    [(0, None), (79.9, None), (80, "caution"), (89.99, "caution"), (90, "warning"), (95, "critical"), (150, "critical")],
+)
+def test_check_threshold_alert_levels(percentage: float, level: str | None) -> None:
+    alert = check_threshold_alert(percentage)
+    assert (alert["level"] if alert else None) == level
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from kimi_proxy.config.display import (
+    get_max_context_for_session,
+    get_model_display_name,
+    get_provider_color,
+    get_provider_display_name,
+    get_provider_icon,
+    get_provider_meta,
+)
+
+
+def test_get_provider_display_name_known_and_fallback() -> None:
+    assert get_provider_display_name("nvidia") == "🟢 NVIDIA"
+    assert get_provider_display_name("managed:my-provider") == "My Provider"
+
+
+def test_get_model_display_name_known_and_fallback() -> None:
+    assert get_model_display_name("nvidia/kimi-k2.5") == "Kimi K2.5"
+    assert get_model_display_name("custom/some-model") == "Some Model"
+    assert get_model_display_name("bare-model") == "Bare Model"
+
+
+def test_get_max_context_for_session_uses_provider_minimum() -> None:
+    models = {
+        "p/large": {"provider": "p", "model": "large-internal", "max_context_size": 200_000},
+        "p/small": {"provider": "p", "model": "small-internal", "max_context_size": 32_000},
+        "q/default": {"provider": "q", "model": "q-internal"},
+    }
+
+    assert get_max_context_for_session({"provider": "p"}, models) == 32_000
+    assert get_max_context_for_session({"provider": "p", "model": "p/large"}, models) == 200_000
+    assert get_max_context_for_session({"provider": "p", "model": "large-internal"}, models) == 200_000
+    assert get_max_context_for_session({"provider": "q"}, models, default=1000) == 1000
+    assert get_max_context_for_session({"provider": "unknown"}, models, default=7) == 7
+    assert get_max_context_for_session({}, models, default=9) == 9
+
+
+def test_get_provider_meta_returns_all_attributes_at_once() -> None:
+    assert get_provider_meta("groq") == ("⚡ Groq", "zap", "yellow")
+    assert get_provider_meta("acme-ai") == ("Acme Ai", "cpu", "slate")
+    assert get_provider_icon("acme-ai") == "cpu"
+    assert get_provider_color("nvidia") == "green"
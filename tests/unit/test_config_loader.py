@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+from kimi_proxy.config.loader import (
+    _clear_config_cache,
+    _expand_env_vars,
+    build_provider_indexes,
+    get_config,
+    get_context_pruning_config,
+    get_sanitizer_config,
+    init_models,
+    init_providers,
+    load_config,
+    reload_config,
+)
+from kimi_proxy.core.exceptions import ConfigurationError
+
+
+def test_expand_env_vars_substitutes_nested_values(monkeypatch) -> None:
+    monkeypatch.setenv("KIMI_TEST_KEY", "secret")
+    config = {"providers": {"p": {"api_key": "${KIMI_TEST_KEY}", "urls": ["${KIMI_TEST_KEY}/x", 3]}}}
+
+    expanded = _expand_env_vars(config)
+
+    assert expanded["providers"]["p"]["api_key"] == "secret"
+    assert expanded["providers"]["p"]["urls"] == ["secret/x", 3]
+
+
+def test_expand_env_vars_keeps_identity_without_substitution() -> None:
+    inner = {"base_url": "http://localhost", "capabilities": ["chat"]}
+    config = {"models": {"m": inner}}
+
+    expanded = _expand_env_vars(config)
+
+    assert expanded is config
+    assert expanded["models"]["m"] is inner
+    assert expanded["models"]["m"]["capabilities"] is inner["capabilities"]
+
+
+def test_expand_env_vars_leaves_unknown_variables_untouched() -> None:
+    assert _expand_env_vars("${KIMI_TEST_UNDEFINED_VAR}") == "${KIMI_TEST_UNDEFINED_VAR}"
+
+
+def _write_toml(path, body: str) -> str:
+    path.write_text(body, encoding="utf-8")
+    return str(path)
+
+
+def test_load_config_caches_per_path(tmp_path) -> None:
+    _clear_config_cache()
+    a = _write_toml(tmp_path / "a.toml", 'default_model = "a"\n')
+    b = _write_toml(tmp_path / "b.toml", 'default_model = "b"\n')
+
+    assert load_config(a)["default_model"] == "a"
+    assert load_config(b)["default_model"] == "b"
+    assert load_config(a) is load_config(a)
+    _clear_config_cache()
+
+
+def test_reload_config_reuses_cache_until_file_changes(tmp_path) -> None:
+    _clear_config_cache()
+    path = tmp_path / "config.toml"
+    _write_toml(path, 'default_model = "first"\n')
+
+    first = load_config(str(path))
+    assert reload_config(str(path)) is first
+
+    _write_toml(path, 'default_model = "second-version"\n')
+    second = reload_config(str(path))
+    assert second is not first
+    assert second["default_model"] == "second-version"
+    assert get_config() is second
+    _clear_config_cache()
+
+
+def test_load_config_cache_hit_on_other_file_notifies_reload(tmp_path) -> None:
+    from kimi_proxy.core import auto_session
+
+    _clear_config_cache()
+    a = _write_toml(tmp_path / "a.toml", '[models."a/m"]\nprovider = "a"\n')
+    b = _write_toml(tmp_path / "b.toml", '[models."b/m"]\nprovider = "b"\n')
+
+    load_config(a)
+    load_config(b)
+    assert "b/m" in auto_session._get_models_config()
+
+    # Retour sur a (servi par le cache): les caches dérivés suivent
+    load_config(a)
+    assert get_config()["models"] == {"a/m": {"provider": "a"}}
+    assert auto_session._get_models_config() is get_config()["models"]
+    _clear_config_cache()
+
+
+def test_load_config_missing_file_raises(tmp_path) -> None:
+    with pytest.raises(ConfigurationError):
+        load_config(str(tmp_path / "absent.toml"))
+
+
+def test_init_models_returns_shared_read_only_view() -> None:
+    config = {"models": {"nvidia/kimi": {"provider": "nvidia", "capabilities": ["chat"]}}}
+
+    models = init_models(config)
+
+    assert init_models(config) is models
+    assert models["nvidia/kimi"]["capabilities"] == ("chat",)
+    with pytest.raises(TypeError):
+        models["nvidia/kimi"]["provider"] = "other"  # type: ignore[index]
+    with pytest.raises(TypeError):
+        init_providers(config)["x"] = {}  # type: ignore[index]
+
+
+def test_get_sanitizer_config_merges_section_and_routing() -> None:
+    config = {"sanitizer": {"threshold_tokens": 42, "trigger_tags": ["@x"], "routing": {"fallback_threshold": 0.5}}}
+
+    cfg = get_sanitizer_config(config)
+
+    assert cfg["threshold_tokens"] == 42
+    assert cfg["tags"] == ["@x"]
+    assert cfg["fallback_threshold"] == 0.5
+    assert cfg["heavy_duty_fallback"] is True
+    assert cfg["enabled"] is True
+    assert "routing" not in cfg and "trigger_tags" not in cfg
+    assert get_sanitizer_config(config) is cfg
+
+
+def test_derived_configs_are_rebuilt_after_cache_clear() -> None:
+    config = {"context_pruning": {"enabled": True}}
+    first = get_context_pruning_config(config)
+    assert get_context_pruning_config(config) is first
+
+    _clear_config_cache()
+
+    assert get_context_pruning_config(config) is not first
+    assert get_context_pruning_config(config) == first
+
+
+def test_load_config_expands_env_vars_from_file(tmp_path, monkeypatch) -> None:
+    _clear_config_cache()
+    monkeypatch.setenv("KIMI_TEST_BASE_URL", "http://example.test")
+    path = _write_toml(
+        tmp_path / "config.toml",
+        '[providers.p]\nbase_url = "${KIMI_TEST_BASE_URL}/v1"\napi_key = "plain"\n',
+    )
+
+    config = load_config(path)
+
+    assert config["providers"]["p"] == {"base_url": "http://example.test/v1", "api_key": "plain"}
+    _clear_config_cache()
+
+
+def test_build_provider_indexes_interns_provider_keys() -> None:
+    provider = "".join(["managed:", "kimi-code"])
+    index = build_provider_indexes({"kimi-code/kimi-for-coding": {"provider": provider}})
+
+    assert index.lookup("kimi-for-coding") is sys.intern("managed:kimi-code")
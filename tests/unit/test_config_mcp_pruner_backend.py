@@ -32,3 +32,7 @@ def test_get_mcp_pruner_backend_config_parses_and_clamps() -> None:
 def test_get_mcp_pruner_backend_config_unknown_backend_falls_back_to_heuristic() -> None:
     cfg = get_mcp_pruner_backend_config({"mcp_pruner": {"backend": "???"}})
     assert cfg.backend == "heuristic"
+
+
+def test_get_mcp_pruner_backend_config_absent_section_returns_shared_defaults() -> None:
+    assert get_mcp_pruner_backend_config({}) is get_mcp_pruner_backend_config({"other": {}})
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from kimi_proxy.config.settings import CompressionConfig, RateLimitConfig, SanitizerConfig, Settings
+
+
+def test_from_dict_overrides_only_present_keys() -> None:
+    cfg = SanitizerConfig.from_dict({"threshold_tokens": 42, "routing": {"ignored": True}})
+
+    assert cfg.threshold_tokens == 42
+    assert cfg == SanitizerConfig(threshold_tokens=42)
+
+
+def test_from_dict_empty_matches_field_defaults() -> None:
+    assert CompressionConfig.from_dict({}) == CompressionConfig()
+    assert RateLimitConfig.from_dict({"max_rpm": 10}) == RateLimitConfig(max_rpm=10)
+
+
+def test_get_models_for_provider_uses_precomputed_groups() -> None:
+    config = {
+        "models": {
+            "a/one": {"provider": "a", "model": "one"},
+            "b/two": {"provider": "b", "model": "two"},
+            "a/three": {"provider": "a", "model": "three"},
+        }
+    }
+    settings = Settings.from_config(config)
+
+    models = settings.get_models_for_provider("a")
+    assert [model["model"] for model in models] == ["one", "three"]
+    assert settings.get_models_for_provider("a") is models
+    assert settings.get_models_for_provider("missing") == ()
@@ -22,6 +22,7 @@ def _reset_memory_db():
             pass
         db_mod._mem_conn = None
     db_mod._invalidate_session_cache()
+    db_mod._invalidate_compaction_stats_cache()
 
 
 @pytest.fixture(autouse=True)
@@ -91,6 +92,17 @@ class TestInMemorySessionCRUD:
         assert session["model"] == "test-model"
         assert session["is_active"] == 1
 
+    @pytest.mark.parametrize("has_returning", [True, False])
+    def test_create_session_returns_full_row(self, has_returning):
+        """INSERT ... RETURNING et le repli INSERT + SELECT renvoient la même ligne."""
+        import kimi_proxy.core.database as db_mod
+        with patch.object(db_mod, "_SQLITE_HAS_RETURNING", has_returning):
+            session = db_mod.create_session("Returning", provider="p1")
+        assert session == db_mod.get_session_by_id(session["id"])
+        assert session["model"] is None
+        assert session["created_at"] is not None
+        assert session["auto_compaction_threshold"] == 0.85
+
     def test_get_active_session_in_memory(self):
         """Récupère la session active après création."""
         from kimi_proxy.core.database import create_session, get_active_session
@@ -151,6 +163,20 @@ class TestInMemorySessionCRUD:
         updated = get_session_by_id(session["id"])
         assert updated["name"] == "Mon premier prompt ici"
 
+
+    def test_update_session_first_prompt_keeps_custom_name(self):
+        """Un nom personnalisé (même 'session...' en minuscules) n'est pas remplacé."""
+        from kimi_proxy.core.database import (
+            create_session, update_session_first_prompt, get_session_by_id
+        )
+        session = create_session("session perso", provider="p1")
+        update_session_first_prompt(session["id"], "x" * 60)
+        assert get_session_by_id(session["id"])["name"] == "session perso"
+
+        generic = create_session("Session Nvidia 10:00:00", provider="p1")
+        update_session_first_prompt(generic["id"], "x" * 60)
+        assert get_session_by_id(generic["id"])["name"] == "x" * 50 + "..."
+
     def test_set_active_session(self):
         """Active une session spécifique."""
         from kimi_proxy.core.database import (
@@ -159,10 +185,35 @@ class TestInMemorySessionCRUD:
         s1 = create_session("S1", provider="p1")
         create_session("S2", provider="p2")
         # s2 est active, activons s1
-        set_active_session(s1["id"])
+        assert set_active_session(s1["id"]) is True
         active = get_active_session()
         assert active["id"] == s1["id"]
 
+    def test_set_active_session_keeps_single_active_row(self):
+        """Une seule session reste active; un ID inconnu retourne False."""
+        from kimi_proxy.core.database import (
+            create_session, get_all_sessions, set_active_session
+        )
+        s1 = create_session("S1", provider="p1")
+        s2 = create_session("S2", provider="p2")
+        set_active_session(s1["id"])
+        set_active_session(s1["id"])
+        active_ids = [s["id"] for s in get_all_sessions() if s["is_active"]]
+        assert active_ids == [s1["id"]]
+        assert set_active_session(s2["id"] + 1000) is False
+
+    def test_active_session_lookup_uses_partial_index(self):
+        """La recherche de la session active passe par idx_sessions_active."""
+        from kimi_proxy.core.database import get_db
+        with get_db() as conn:
+            plan = " ".join(
+                row[3] for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT * FROM sessions "
+                    "WHERE is_active = 1 ORDER BY id DESC LIMIT 1"
+                )
+            )
+        assert "idx_sessions_active" in plan
+
     def test_delete_session(self):
         """Supprime une session en mémoire."""
         from kimi_proxy.core.database import (
@@ -173,11 +224,165 @@ class TestInMemorySessionCRUD:
         assert result is True
         assert get_session_by_id(session["id"]) is None
 
+    def test_session_stats_aggregates_metrics(self):
+        """Les stats cumulent prompt réel sinon estimé, plus la complétion."""
+        from kimi_proxy.core.database import (
+            create_session, get_session_stats, save_metric, update_metric_with_real_tokens
+        )
+        session = create_session("Stats", provider="p1")
+        save_metric(session["id"], 100, 1.0, "estimée")
+        metric_id = save_metric(session["id"], 50, 1.0, "réelle")
+        update_metric_with_real_tokens(metric_id, 40, 10, 50, 1000)
+
+        result = get_session_stats(session["id"])
+        stats = result["stats"]
+        assert stats["total_requests"] == 2
+        assert stats["max_tokens"] == 100
+        assert stats["cumulative_input_tokens"] == 140
+        assert stats["cumulative_output_tokens"] == 10
+        assert stats["cumulative_total_tokens"] == 150
+        assert len(result["recent_metrics"]) == 2
+
+        from kimi_proxy.core.database import get_session_cumulative_tokens
+        assert get_session_cumulative_tokens(session["id"]) == {
+            "input_tokens": 140, "output_tokens": 10, "total_tokens": 150
+        }
+        assert get_session_cumulative_tokens(-1)["total_tokens"] == 0
+
+
+    def test_save_metrics_many_inserts_in_one_batch(self):
+        """Insertion groupée avec les mêmes valeurs par défaut que save_metric."""
+        from kimi_proxy.core.database import create_session, get_recent_metrics, save_metrics_many
+        session = create_session("Batch", provider="p1")
+        rows = [
+            (session["id"], 10, 1.0, "x" * 300, True, "proxy", 0, 0, 0.0),
+            (session["id"], 20, 2.0, "second", False, "logs", 5, 15, 0.25),
+        ]
+
+        assert save_metrics_many(rows) == 2
+        assert save_metrics_many([]) == 0
+
+        metrics = get_recent_metrics(session["id"])
+        assert sorted(m["estimated_tokens"] for m in metrics) == [10, 20]
+        assert max(len(m["content_preview"]) for m in metrics) == 200
+
+    @pytest.mark.parametrize("has_returning", [True, False])
+    def test_consecutive_auto_compactions_counter(self, has_returning):
+        """Incrément (UPDATE ... RETURNING ou repli UPDATE + SELECT) puis remise à zéro."""
+        import kimi_proxy.core.database as db_mod
+        session = db_mod.create_session("Counter", provider="p1")
+        with patch.object(db_mod, "_SQLITE_HAS_RETURNING", has_returning):
+            assert db_mod.increment_consecutive_auto_compactions(session["id"]) == 1
+            assert db_mod.increment_consecutive_auto_compactions(session["id"]) == 2
+        assert db_mod.reset_consecutive_auto_compactions(session["id"]) is True
+        state = db_mod.get_session_compaction_state(session["id"])
+        assert state["consecutive_auto_compactions"] == 0
+
+    def test_global_compaction_stats_cached_until_history_write(self):
+        """Statistiques globales servies depuis le cache, recalculées après écriture."""
+        from kimi_proxy.core.database import (
+            create_session, get_global_compaction_stats, save_compaction_history,
+        )
+        session = create_session("Stats", provider="p1")
+        first = get_global_compaction_stats()
+        assert first["global"]["total_compactions"] == 0
+        assert get_global_compaction_stats() is first
+
+        save_compaction_history(session["id"], 1000, 600, 2, 4)
+        second = get_global_compaction_stats()
+        assert second is not first
+        assert second["global"]["total_compactions"] == 1
+        assert second["sessions"] == [
+            {"session_id": session["id"], "compaction_count": 1, "session_tokens_saved": 400}
+        ]
+
+    def test_save_compaction_history_bulk_matches_single_saves(self):
+        """Lot en une transaction: IDs dans l'ordre, compteurs agrégés par session."""
+        from kimi_proxy.core.database import (
+            create_session, get_compaction_history, get_session_compaction_state,
+            save_compaction_history, save_compaction_history_bulk,
+        )
+        s1 = create_session("Bulk 1", provider="p1")
+        s2 = create_session("Bulk 2", provider="p1")
+        save_compaction_history(s1["id"], 100, 90, 1, 1)
+
+        ids = save_compaction_history_bulk([
+            (s1["id"], 1000, 400, 2, 8, "replay"),
+            (s2["id"], 500, 450, 1, 2),
+            (s1["id"], 200, 150, 1, 1, "replay"),
+        ])
+        assert save_compaction_history_bulk([]) == []
+
+        history_s1 = get_compaction_history(s1["id"])
+        assert len(history_s1) == 3
+        assert {h["id"] for h in history_s1} >= {ids[0], ids[2]}
+        assert [h["id"] for h in get_compaction_history(s2["id"])] == [ids[1]]
+        state = get_session_compaction_state(s1["id"])
+        assert state["compaction_count"] == 3
+        assert state["total_tokens_saved"] == 10 + 600 + 50
+        assert get_session_compaction_state(s2["id"])["total_tokens_saved"] == 50
+
+    def test_save_compaction_history_is_atomic(self):
+        """Historique et compteurs de session sont écrits ensemble ou pas du tout."""
+        import sqlite3
+        from kimi_proxy.core.database import (
+            create_session, get_compaction_history, get_db,
+            get_session_compaction_state, save_compaction_history,
+        )
+        session = create_session("Compaction", provider="p1")
+        history_id = save_compaction_history(session["id"], 1000, 250, 3, 7, "auto")
+
+        history = get_compaction_history(session["id"])
+        assert [h["id"] for h in history] == [history_id]
+        assert history[0]["tokens_saved"] == 750
+        # Mêmes clés que le modèle exposé par l'API
+        from kimi_proxy.core.models import CompactionHistoryEntry
+        assert list(history[0]) == list(CompactionHistoryEntry().to_dict())
+        state = get_session_compaction_state(session["id"])
+        assert state["compaction_count"] == 1
+        assert state["total_tokens_saved"] == 750
+        assert [h["id"] for h in state["history"]] == [history_id]
+
+        # Un échec de la mise à jour de la session annule aussi l'INSERT
+        with get_db() as conn:
+            conn.execute(
+                "CREATE TRIGGER fail_session_update BEFORE UPDATE ON sessions "
+                "BEGIN SELECT RAISE(ABORT, 'boom'); END"
+            )
+            conn.commit()
+        try:
+            with pytest.raises(sqlite3.IntegrityError):
+                save_compaction_history(session["id"], 500, 100, 1, 1)
+        finally:
+            with get_db() as conn:
+                conn.execute("DROP TRIGGER IF EXISTS fail_session_update")
+                conn.commit()
+        assert len(get_compaction_history(session["id"])) == 1
+
+    def test_session_compaction_state_uses_a_single_connection(self):
+        """État de compaction et historique lus sur une seule connexion empruntée."""
+        import kimi_proxy.core.database as db_mod
+        session = db_mod.create_session("One conn", provider="p1")
+        db_mod.save_compaction_history(session["id"], 1000, 400, 2, 3)
+
+        borrows = []
+        real_get_db = db_mod.get_db
+
+        def counting_get_db():
+            borrows.append(1)
+            return real_get_db()
+
+        with patch.object(db_mod, "get_db", counting_get_db):
+            state = db_mod.get_session_compaction_state(session["id"])
+        assert len(borrows) == 1
+        assert state["total_tokens_saved"] == 600
+        assert len(state["history"]) == 1
+
 
 # ── Tests Cache TTL ──────────────────────────────────────────────────────────
 
 class TestActiveSessionCache:
-    """Vérifie le comportement du cache TTL de la session active."""
+    """Vérifie le cache de la session active et son invalidation."""
 
     @pytest.fixture(autouse=True)
     def force_in_memory(self):
@@ -207,6 +412,34 @@ class TestActiveSessionCache:
         assert second["name"] == "Second"
         assert first is not second
 
+    def test_cache_invalidated_by_every_session_write(self):
+        """Toute écriture sur sessions (compaction comprise) invalide le cache."""
+        from kimi_proxy.core.database import (
+            create_session, get_active_session, update_session_reserved_tokens
+        )
+        session = create_session("Reserved", provider="p1")
+        assert get_active_session()["reserved_tokens"] == 0
+
+        update_session_reserved_tokens(session["id"], 1234)
+        assert get_active_session()["reserved_tokens"] == 1234
+
+    def test_read_crossing_a_write_is_not_cached(self):
+        """Un résultat lu avant une invalidation concurrente n'est pas mis en cache."""
+        import kimi_proxy.core.database as db_mod
+        db_mod.create_session("Racy", provider="p1")
+        db_mod._invalidate_session_cache()
+
+        real_fetchone_dict = db_mod._fetchone_dict
+
+        def fetch_then_invalidate(cursor):
+            row = real_fetchone_dict(cursor)
+            db_mod._invalidate_session_cache()  # écriture concurrente simulée
+            return row
+
+        with patch.object(db_mod, "_fetchone_dict", fetch_then_invalidate):
+            assert db_mod.get_active_session()["name"] == "Racy"
+        assert db_mod._cached_active_session is None
+
 
 # ── Tests init_database mode selection ───────────────────────────────────────
 
@@ -230,3 +463,210 @@ class TestInitDatabaseMode:
                 from kimi_proxy.core.database import init_database
                 init_database()
                 assert os.path.exists(db_file)
+
+    def test_persist_uses_wal_and_connection_pragmas(self, tmp_path):
+        """En mode persistant, la DB passe en WAL et chaque connexion est configurée."""
+        db_file = str(tmp_path / "sessions.db")
+        with patch.dict(os.environ, {"KIMI_PERSIST_SESSIONS": "true"}):
+            with patch("kimi_proxy.core.database.DATABASE_FILE", db_file):
+                from kimi_proxy.core.database import get_db, init_database
+                init_database()
+                with get_db() as conn:
+                    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+                    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+                    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+    def test_persist_enables_wal_without_init_database(self, tmp_path):
+        """Une connexion fichier ouverte sans init_database() passe aussi en WAL."""
+        db_file = str(tmp_path / "no_init.db")
+        with patch.dict(os.environ, {"KIMI_PERSIST_SESSIONS": "true"}):
+            with patch("kimi_proxy.core.database.DATABASE_FILE", db_file):
+                from kimi_proxy.core.database import get_db
+                with get_db() as conn:
+                    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_persist_reader_is_read_only_and_sees_writer_commits(self, tmp_path):
+        """Les lectures passent par une connexion mode=ro distincte de l'écrivain."""
+        import sqlite3
+        db_file = str(tmp_path / "rw.db")
+        with patch.dict(os.environ, {"KIMI_PERSIST_SESSIONS": "true"}):
+            with patch("kimi_proxy.core.database.DATABASE_FILE", db_file):
+                from kimi_proxy.core.database import (
+                    create_session, get_reader_db, get_session_compaction_state,
+                    init_database, save_compaction_history,
+                )
+                init_database()
+                session = create_session("RW", provider="p1")
+                save_compaction_history(session["id"], 1000, 400, 2, 8)
+
+                state = get_session_compaction_state(session["id"])
+                assert state["compaction_count"] == 1
+                assert state["total_tokens_saved"] == 600
+
+                with get_reader_db() as conn:
+                    with pytest.raises(sqlite3.OperationalError):
+                        conn.execute("DELETE FROM sessions")
+
+    def test_persist_setters_return_false_when_database_is_locked(self, tmp_path):
+        """Base verrouillée par un autre processus: les setters renvoient False."""
+        import sqlite3
+        import kimi_proxy.core.database as db_mod
+        db_file = str(tmp_path / "locked.db")
+        # Pas d'attente busy_timeout: l'échec de BEGIN IMMEDIATE est immédiat
+        pragmas = tuple(
+            "PRAGMA busy_timeout=0" if p.startswith("PRAGMA busy_timeout") else p
+            for p in db_mod._CONNECTION_PRAGMAS
+        )
+        with patch.dict(os.environ, {"KIMI_PERSIST_SESSIONS": "true"}):
+            with patch.object(db_mod, "DATABASE_FILE", db_file), \
+                    patch.object(db_mod, "_CONNECTION_PRAGMAS", pragmas):
+                db_mod.init_database()
+                session = db_mod.create_session("Locked", provider="p1")
+
+                other = sqlite3.connect(db_file, timeout=0)
+                other.execute("BEGIN IMMEDIATE")
+                try:
+                    assert db_mod.update_session_reserved_tokens(session["id"], 10) is False
+                    assert db_mod.update_session_auto_compaction(session["id"], False) is False
+                    assert db_mod.update_session_auto_threshold(session["id"], 0.5) is False
+                    assert db_mod.reset_consecutive_auto_compactions(session["id"]) is False
+                finally:
+                    other.rollback()
+                    other.close()
+
+                assert db_mod.update_session_auto_threshold(session["id"], 0.5) is True
+
+    def test_persist_migrates_missing_columns_once(self, tmp_path):
+        """Un schéma ancien reçoit les colonnes manquantes, sans rejouer les migrations."""
+        import sqlite3
+        db_file = str(tmp_path / "sessions.db")
+        legacy = sqlite3.connect(db_file)
+        legacy.execute(
+            "CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+            "provider TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, is_active BOOLEAN DEFAULT 0)"
+        )
+        legacy.execute("INSERT INTO sessions (name) VALUES ('legacy')")
+        legacy.commit()
+        legacy.close()
+
+        with patch.dict(os.environ, {"KIMI_PERSIST_SESSIONS": "true"}):
+            with patch("kimi_proxy.core.database.DATABASE_FILE", db_file):
+                from kimi_proxy.core.database import get_all_sessions, init_database
+                init_database()
+                init_database()
+                sessions = get_all_sessions()
+
+        assert sessions[0]["name"] == "legacy"
+        assert sessions[0]["auto_compaction_threshold"] == 0.85
+        assert sessions[0]["model"] is None
+
+    @staticmethod
+    def _create_legacy_compaction_db(db_file):
+        """Base d'avant total_tokens_saved, compaction_history sans colonnes générées."""
+        import sqlite3
+        import kimi_proxy.core.database as db_mod
+        legacy = sqlite3.connect(db_file)
+        legacy.executescript(db_mod._SCHEMA_DDL)
+        with patch.object(db_mod, "_SQLITE_HAS_GENERATED_COLUMNS", False):
+            legacy.execute("DROP TABLE compaction_history")
+            legacy.execute(db_mod._compaction_history_ddl("compaction_history"))
+        for table, column, definition in db_mod._MIGRATION_COLUMNS:
+            existing = {row[1] for row in legacy.execute(f"PRAGMA table_info({table})")}
+            if column != "total_tokens_saved" and column not in existing:
+                legacy.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        legacy.execute("INSERT INTO sessions (name, compaction_count) VALUES ('legacy', 2)")
+        legacy.executemany(
+            "INSERT INTO compaction_history (session_id, tokens_before, tokens_after, tokens_saved, "
+            "preserved_messages, summarized_messages, compaction_ratio) VALUES (1, ?, ?, ?, 1, 1, 0)",
+            [(100, 70, 30), (50, 38, 12)],
+        )
+        legacy.commit()
+        legacy.close()
+
+    def test_persist_migration_backfills_total_tokens_saved(self, tmp_path):
+        """La colonne sessions.total_tokens_saved est remplie depuis l'historique existant."""
+        db_file = str(tmp_path / "sessions.db")
+        self._create_legacy_compaction_db(db_file)
+
+        with patch.dict(os.environ, {"KIMI_PERSIST_SESSIONS": "true"}):
+            with patch("kimi_proxy.core.database.DATABASE_FILE", db_file):
+                from kimi_proxy.core.database import (
+                    get_global_compaction_stats, get_session_compaction_state, init_database,
+                )
+                init_database()
+                assert get_session_compaction_state(1)["total_tokens_saved"] == 42
+                assert get_global_compaction_stats()["sessions"] == [
+                    {"session_id": 1, "compaction_count": 2, "session_tokens_saved": 42}
+                ]
+
+    def test_persist_migration_generates_compaction_columns(self, tmp_path):
+        """Économie et ratio de l'historique existant deviennent des colonnes générées."""
+        import kimi_proxy.core.database as db_mod
+        if not db_mod._SQLITE_HAS_GENERATED_COLUMNS:
+            pytest.skip("SQLite < 3.31: pas de colonnes générées")
+        db_file = str(tmp_path / "sessions.db")
+        self._create_legacy_compaction_db(db_file)
+
+        with patch.dict(os.environ, {"KIMI_PERSIST_SESSIONS": "true"}):
+            with patch("kimi_proxy.core.database.DATABASE_FILE", db_file):
+                db_mod.init_database()
+                db_mod.init_database()
+                new_id = db_mod.save_compaction_history(1, 200, 150, 1, 1)
+                history = db_mod.get_compaction_history(1)
+                with db_mod.get_db() as conn:
+                    hidden = {
+                        row[1]: row[6]
+                        for row in conn.execute("PRAGMA table_xinfo(compaction_history)")
+                    }
+
+        assert hidden["tokens_saved"] == hidden["compaction_ratio"] == 3
+        assert new_id == 3
+        assert sorted((h["id"], h["tokens_saved"], h["compaction_ratio"]) for h in history) == [
+            (1, 30, 30.0), (2, 12, 24.0), (3, 50, 25.0)
+        ]
+
+
+# ── Tests pool de connexions ─────────────────────────────────────────────────
+
+class TestConnectionPool:
+    """Vérifie la réutilisation des connexions empruntées via get_db."""
+
+    @pytest.fixture(autouse=True)
+    def force_in_memory(self):
+        with patch.dict(os.environ, {"KIMI_PERSIST_SESSIONS": "false"}):
+            from kimi_proxy.core.database import init_database
+            init_database()
+            yield
+
+    def test_connection_is_reused_between_checkouts(self):
+        """Une connexion rendue au pool est réutilisée par l'emprunt suivant."""
+        from kimi_proxy.core.database import get_db
+        with get_db() as first:
+            pass
+        with get_db() as second:
+            assert second is first
+
+    def test_open_transaction_is_rolled_back_on_release(self):
+        """Une écriture non commitée n'est pas conservée par la connexion poolée."""
+        from kimi_proxy.core.database import get_all_sessions, get_db
+        with get_db() as conn:
+            conn.execute("INSERT INTO sessions (name) VALUES ('uncommitted')")
+            assert conn.in_transaction
+        assert not conn.in_transaction
+        assert all(s["name"] != "uncommitted" for s in get_all_sessions())
+
+    def test_transaction_commits_or_rolls_back_as_a_whole(self):
+        """transaction() commit en sortie normale, annule tout sur exception."""
+        from kimi_proxy.core.database import get_all_sessions, get_db, transaction
+        with get_db() as conn, transaction(conn):
+            conn.execute("INSERT INTO sessions (name) VALUES ('tx-ok')")
+        assert not conn.in_transaction
+
+        with pytest.raises(RuntimeError):
+            with get_db() as conn, transaction(conn):
+                conn.execute("INSERT INTO sessions (name) VALUES ('tx-ko')")
+                raise RuntimeError("boom")
+
+        names = {s["name"] for s in get_all_sessions()}
+        assert "tx-ok" in names
+        assert "tx-ko" not in names
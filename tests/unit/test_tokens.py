@@ -27,3 +27,137 @@ def test_count_tokens_tiktoken_messages(sample_messages):
     assert tokens > 0
     # Chaque message ajoute au moins 3 tokens (début/role/fin)
     assert tokens >= len(sample_messages) * 3
+
+
+def test_count_tokens_tiktoken_role_tokens_match_encoding():
+    """Test: rôles usuels précalculés et rôles inconnus comptés comme avant."""
+    from kimi_proxy.core.tokens import ENCODING
+
+    for role in ("system", "user", "assistant", "tool", "function", "developer", ""):
+        expected = 3 + len(ENCODING.encode(role)) + len(ENCODING.encode("Salut")) + 3
+        assert count_tokens_tiktoken([{"role": role, "content": "Salut"}]) == expected
+
+
+def test_count_tokens_tiktoken_batch_matches_sequential(monkeypatch):
+    """Test: l'encodage groupé (encode_batch) donne le même total que l'encodage séquentiel."""
+    from kimi_proxy.core import tokens
+
+    messages = [
+        {"role": "user", "content": f"Message numéro {i}"} for i in range(5)
+    ] + [
+        {"role": "user", "content": [
+            {"type": "text", "text": "Décris cette image"},
+            {"type": "image_url", "image_url": {"url": "http://x/y.png"}},
+        ]},
+    ]
+    sequential = count_tokens_tiktoken(messages)
+
+    tokens._PREFIX_TOKEN_CACHE.clear()
+    monkeypatch.setattr(tokens, "_BATCH_THREADS", 2)
+    monkeypatch.setattr(tokens, "_BATCH_MIN_TEXTS", 1)
+    assert count_tokens_tiktoken(messages) == sequential
+
+
+def test_count_tokens_text_cached_for_short_and_large_texts(monkeypatch):
+    """Test: comptages mis en cache, clé condensée et éviction LRU pour les longs textes."""
+    from kimi_proxy.core import tokens
+
+    short = "Tu es un assistant de code."
+    assert count_tokens_text(short) == len(tokens.ENCODING.encode(short))
+    hits = tokens._count_tokens_text_cached.cache_info().hits
+    count_tokens_text(short)
+    assert tokens._count_tokens_text_cached.cache_info().hits == hits + 1
+
+    monkeypatch.setattr(tokens, "_LARGE_TEXT_CHARS", 10)
+    monkeypatch.setattr(tokens, "_LARGE_TEXT_CACHE_MAX_ENTRIES", 2)
+    tokens._large_text_tokens.clear()
+    texts = [f"texte long numéro {i}" for i in range(3)]
+    for text in texts:
+        assert count_tokens_text(text) == len(tokens.ENCODING.encode(text))
+    assert len(tokens._large_text_tokens) == 2
+    assert all(isinstance(key, bytes) for key in tokens._large_text_tokens)
+
+    encode_calls = []
+    real_encoding = tokens.ENCODING
+
+    class CountingEncoding:
+        def encode(self, text):
+            encode_calls.append(text)
+            return real_encoding.encode(text)
+
+    monkeypatch.setattr(tokens, "ENCODING", CountingEncoding())
+    count_tokens_text(texts[2])
+    assert encode_calls == []
+    count_tokens_text(texts[0])  # évincé, réencodé
+    assert encode_calls == [texts[0]]
+    tokens._large_text_tokens.clear()
+
+
+def test_count_tokens_tiktoken_encodes_only_new_messages(monkeypatch):
+    """Test: un historique qui s'allonge ne réencode que les messages ajoutés."""
+    from kimi_proxy.core import tokens
+
+    history = [
+        {"role": "system", "content": "Tu es un assistant."},
+        {"role": "user", "content": "Bonjour"},
+    ]
+    tokens._PREFIX_TOKEN_CACHE.clear()
+    first = count_tokens_tiktoken(history)
+
+    encoded = []
+    real_encoding = tokens.ENCODING
+
+    class CountingEncoding:
+        def encode(self, text):
+            encoded.append(text)
+            return real_encoding.encode(text)
+
+    monkeypatch.setattr(tokens, "ENCODING", CountingEncoding())
+    assert count_tokens_tiktoken(history) == first
+    assert encoded == []
+
+    grown = history + [{"role": "assistant", "content": "Salut !"}]
+    total = count_tokens_tiktoken(grown)
+    assert encoded == ["Salut !"]
+    assert total == first + 3 + len(real_encoding.encode("assistant")) + len(real_encoding.encode("Salut !"))
+
+    # Un message modifié invalide le préfixe: recompté en entier
+    edited = [history[0], {"role": "user", "content": "Bonsoir"}, grown[2]]
+    count_tokens_tiktoken(edited)
+    assert encoded[1:] == ["Tu es un assistant.", "Bonsoir", "Salut !"]
+    tokens._PREFIX_TOKEN_CACHE.clear()
+
+
+def test_estimate_tokens_json_close_to_serialized_count():
+    """Test: estimation structurelle proche du comptage de la chaîne JSON, 0 si non sérialisable."""
+    import json
+
+    from kimi_proxy.core.tokens import estimate_tokens_json
+
+    data = {
+        "model": "kimi-for-coding",
+        "stream": True,
+        "temperature": 0.7,
+        "max_tokens": None,
+        "messages": [{"role": "user", "content": "Écris une fonction Python"}] * 5,
+    }
+    exact = count_tokens_text(json.dumps(data, ensure_ascii=False))
+    assert abs(estimate_tokens_json(data) - exact) <= exact * 0.05
+
+    # Code et JSON imbriqué: retours à la ligne, guillemets, antislashs et
+    # tabulations sont comptés sous leur forme échappée
+    code = 'def lire(chemin):\n\t"""Lit \\"C:\\\\tmp\\"."""\n\treturn open(chemin).read()\n' * 20
+    escaped = {
+        "messages": [
+            {"role": "user", "content": code},
+            {"role": "tool", "content": json.dumps({"path": "C:\\src\\a.py", "body": code[:300]})},
+        ]
+    }
+    exact = count_tokens_text(json.dumps(escaped, ensure_ascii=False))
+    assert abs(estimate_tokens_json(escaped) - exact) <= exact * 0.02
+    assert estimate_tokens_json([]) == estimate_tokens_json({}) > 0
+
+    circular = []
+    circular.append(circular)
+    assert estimate_tokens_json(circular) == 0
+    assert estimate_tokens_json({"ids": {1, 2}}) == 0